@@ -1,6 +1,8 @@
 # %% Imports
 import logging
-from asyncio import run
+import os
+from asyncio import gather, get_running_loop, run
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from utils.constants import COMPILED_CONTRACTS, NETWORK
@@ -10,22 +12,62 @@ logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Each compilation is a single-threaded starknet-compile-deprecated subprocess
+COMPILE_WORKERS = int(os.getenv("COMPILE_WORKERS", os.cpu_count() or 1))
+
+
+def _compile(contract):
+    logger.info(f"⏳ Compiling {contract['contract_name']}")
+    start = datetime.now()
+    compiled = False
+    try:
+        compile_contract(contract)
+        compiled = True
+    finally:
+        elapsed = (datetime.now() - start).total_seconds()
+        logger.info(
+            f"{'✅ Compiled' if compiled else '❌ Failed to compile'} "
+            f"{contract['contract_name']} in {elapsed:.2f}s"
+        )
+    return elapsed
+
 
 # %% Main
 async def main():
     # %% Compile
-    logger.info(f"ℹ️  Compiling contracts for network {NETWORK['name']}")
+    logger.info(
+        f"ℹ️  Compiling contracts for network {NETWORK['name']} "
+        f"with {COMPILE_WORKERS} workers"
+    )
     initial_time = datetime.now()
-    for contract in COMPILED_CONTRACTS:
-        logger.info(f"⏳ Compiling {contract}")
-        start = datetime.now()
-        compile_contract(contract)
-        elapsed = datetime.now() - start
-        logger.info(f"✅ Compiled in {elapsed.total_seconds():.2f}s")
+    loop = get_running_loop()
+    with ThreadPoolExecutor(max_workers=COMPILE_WORKERS) as executor:
+        results = await gather(
+            *[
+                loop.run_in_executor(executor, _compile, contract)
+                for contract in COMPILED_CONTRACTS
+            ],
+            return_exceptions=True,
+        )
 
+    failures = {
+        contract["contract_name"]: result
+        for contract, result in zip(COMPILED_CONTRACTS, results)
+        if isinstance(result, Exception)
+    }
+    for contract_name, error in failures.items():
+        message = error.args[0] if error.args else error
+        if isinstance(message, bytes):
+            message = message.decode(errors="replace")
+        logger.error(f"❌ Cannot compile {contract_name}:\n{message}")
     logger.info(
-        f"✅ Compiled all in {(datetime.now() - initial_time).total_seconds():.2f}s"
+        f"{'❌' if failures else '✅'} Compiled "
+        f"{len(COMPILED_CONTRACTS) - len(failures)}/{len(COMPILED_CONTRACTS)} in "
+        f"{(datetime.now() - initial_time).total_seconds():.2f}s "
+        f"(sum of compilations {sum(r for r in results if isinstance(r, float)):.2f}s)"
     )
+    if failures:
+        raise RuntimeError(f"Cannot compile {', '.join(failures)}")
 
 
 # %% Run
@@ -22,7 +22,8 @@ async def main():
         contract["contract_name"]: await declare(contract["contract_name"])
         for contract in COMPILED_CONTRACTS
     }
-    dump_declarations(class_hash)
+    # every compiled contract is declared again
+    dump_declarations(class_hash, replace=True)
 
 
 # %% Main
@@ -42,7 +42,8 @@ async def main():
     if NETWORK["devnet"]:
         deployments["Multicall"] = await deploy("Multicall")
 
-    dump_deployments(deployments)
+    # the Starksheet deployments are redone from scratch
+    dump_deployments(deployments, replace=True)
 
 
 # %% Main
@@ -4,18 +4,18 @@ from asyncio import run
 
 import pandas as pd
 from starkware.starknet.public.abi import get_selector_from_name
-from utils.deployment import (
+from utils.starknet import (
     compile_contract,
     declare,
     deploy,
     dump_declarations,
     dump_deployments,
-    get_account,
     get_alias,
     get_artifact,
     get_declarations,
     get_deployments,
-    invoke,
+    get_starknet_account,
+    invoke_many,
 )
 
 logging.basicConfig()
@@ -40,16 +40,15 @@ async def main():
     class_hash = get_declarations()
     deployments = get_deployments()
     deployments["DustyPilotRenderer"] = {
-        **dict(
-            zip(
-                ["address", "tx"],
-                await deploy(
-                    "proxy",
-                    (await get_account()).address,  # proxy_admin
-                    class_hash["DustyPilotRenderer"],  # implementation_hash
-                    get_selector_from_name("initialize"),  # selector
-                    ((await get_account()).address,),  # calldata  # proxy_admin_address
-                ),
+        **(
+            await deploy(
+                "proxy",
+                (await get_starknet_account()).address,  # proxy_admin
+                class_hash["DustyPilotRenderer"],  # implementation_hash
+                get_selector_from_name("initialize"),  # selector
+                (
+                    (await get_starknet_account()).address,  # proxy_admin_address
+                ),  # calldata
             )
         ),
         "artifact": get_artifact("DustyPilotRenderer"),
@@ -57,25 +56,20 @@ async def main():
     }
 
     deployments["DustyPilots"] = {
-        **dict(
-            zip(
-                ["address", "tx"],
-                await deploy(
-                    "proxy",
-                    (await get_account()).address,  # proxy_admin
-                    class_hash["DustyPilots"],  # implementation_hash
-                    get_selector_from_name("initialize"),  # selector
-                    (
-                        int.from_bytes(b"Dusty Pilots", "big"),
-                        int.from_bytes(b"DSTP", "big"),
-                        (await get_account()).address,
-                        0,  # merkle_root
-                        0,  # max_per_wallet
-                        deployments["DustyPilotRenderer"][
-                            "address"
-                        ],  # renderer_address
-                    ),  # calldata
-                ),
+        **(
+            await deploy(
+                "proxy",
+                (await get_starknet_account()).address,  # proxy_admin
+                class_hash["DustyPilots"],  # implementation_hash
+                get_selector_from_name("initialize"),  # selector
+                (
+                    int.from_bytes(b"Dusty Pilots", "big"),
+                    int.from_bytes(b"DSTP", "big"),
+                    (await get_starknet_account()).address,
+                    0,  # merkle_root
+                    0,  # max_per_wallet
+                    deployments["DustyPilotRenderer"]["address"],  # renderer_address
+                ),  # calldata
             )
         ),
         "artifact": get_artifact("DustyPilots"),
@@ -86,19 +80,25 @@ async def main():
 
     # %% Setup
     thresholds = pd.read_csv("dust_pilots/dusted.csv").threshold.to_list()
-    await invoke("DustyPilotRenderer", "setThresholds", thresholds)
-    await invoke("DustyPilots", "openMint")
-    await invoke("DustyPilots", "setNRow", 19)
     value = 0x1234
     token_id = 4
-    await invoke(
-        "DustyPilots",
-        "mintAndSetPublic",
-        token_id,  # tokenId
-        [],  # proof
-        2**128,  # contractAddress
-        value,
-        [],  # cellCalldata_len, cellCalldata
+    await invoke_many(
+        [
+            ("DustyPilotRenderer", "setThresholds", [thresholds]),
+            ("DustyPilots", "openMint", []),
+            ("DustyPilots", "setNRow", [19]),
+            (
+                "DustyPilots",
+                "mintAndSetPublic",
+                [
+                    token_id,  # tokenId
+                    [],  # proof
+                    2**128,  # contractAddress
+                    value,
+                    [],  # cellCalldata_len, cellCalldata
+                ],
+            ),
+        ]
     )
 
 
@@ -6,20 +6,19 @@ from itertools import chain
 from string import ascii_letters
 from textwrap import wrap
 
-from starkware.starknet.public.abi import get_selector_from_name
-from utils.deployment import (
-    call,
+from utils.starknet import (
+    call_many,
     compile_contract,
     declare,
     deploy,
     dump_declarations,
     dump_deployments,
-    get_account,
     get_alias,
-    get_artifact,
     get_declarations,
     get_deployments,
+    get_starknet_account,
     invoke,
+    pinned_block,
 )
 
 logging.basicConfig()
@@ -31,31 +30,21 @@ logger.setLevel(logging.INFO)
 async def main():
     # %% Compile & declare contracts
     class_hash = get_declarations()
-    for contract_name in [
-        "RandomRenderer",
-        "proxy",
-    ]:
-        compile_contract(contract_name)
-        class_hash[contract_name] = await declare(contract_name)
+    compile_contract({"contract_name": "RandomRenderer", "is_account_contract": False})
+    class_hash["RandomRenderer"] = await declare("RandomRenderer")
     dump_declarations(class_hash)
 
     # %% Deploy contracts
-    class_hash = get_declarations()
     deployments = get_deployments()
+    # the renderer has a constructor, not the initialize entry point called by the proxy
     deployments["RandomRenderer"] = {
-        **dict(
-            zip(
-                ["address", "tx"],
-                await deploy(
-                    "proxy",
-                    (await get_account()).address,  # proxy_admin
-                    class_hash["RandomRenderer"],  # implementation_hash
-                    get_selector_from_name("initialize"),  # selector
-                    ((await get_account()).address,),  # calldata  # proxy_admin_address
-                ),
+        **(
+            await deploy(
+                "RandomRenderer",
+                (await get_starknet_account()).address,  # owner
+                [],  # uris, set below
             )
         ),
-        "artifact": get_artifact("RandomRenderer"),
         "alias": get_alias("RandomRenderer"),
     }
     dump_deployments(deployments)
@@ -74,32 +63,24 @@ async def main():
     )
     await invoke("RandomRenderer", "setUris", uris_encoded)
     c = Counter()
-    for i in range(100):
-        uri = bytes.fromhex(
-            "".join(
-                [
-                    hex(p)[2:]
-                    for p in (
-                        await call("RandomRenderer", "token_uri", i, 0, 0)
-                    ).token_uri
-                ]
-            )
-        ).decode()
+    # all the reads of the sweep see the state right after setUris
+    async with pinned_block():
+        token_uris = await call_many(
+            [("RandomRenderer", "token_uri", [i, 0, 0]) for i in range(100)]
+        )
+        test_uris = await call_many(
+            [
+                ("RandomRenderer", "testUris", [uris_encoded, i])
+                for i in range(len(uris))
+            ]
+        )
+    for token_uri in token_uris:
+        uri = bytes.fromhex("".join([hex(p)[2:] for p in token_uri.token_uri])).decode()
         assert uri in uris
         c[uri] += 1
-    for i, uri in enumerate(uris):
+    for test_uri, uri in zip(test_uris, uris):
         assert (
-            bytes.fromhex(
-                "".join(
-                    [
-                        hex(p)[2:]
-                        for p in (
-                            await call("RandomRenderer", "testUris", uris_encoded, i)
-                        ).uri
-                    ]
-                )
-            ).decode()
-            == uri
+            bytes.fromhex("".join([hex(p)[2:] for p in test_uri.uri])).decode() == uri
         )
 
 
@@ -3,9 +3,11 @@ import json
 import logging
 from asyncio import run
 
-from utils.constants import ALLOW_LIST
-from utils.deployment import call, invoke
-from utils.merkle_proof import address_to_leaf, merkle_proofs, merkle_root
+from utils.constants import ALLOW_LIST, ALLOW_LIST_FILE, MERKLE_CACHE_DIR
+from utils.merkle_cache import MerkleTreeCache
+from utils.merkle_stream import read_addresses, sorted_addresses, write_proofs_jsonl
+from utils.proof_store import write_proof_store
+from utils.starknet import call, invoke, wait_for_transactions
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -15,29 +17,42 @@ logger.setLevel(logging.INFO)
 # %% Main
 async def main():
     # %% Computing allow list
-    logger.info("Computing Merkle proofs...")
-    json.dump(
-        {
-            hex(address): [str(p) for p in proof]
-            for address, proof in merkle_proofs(ALLOW_LIST).items()
-        },
-        open("allow_list.json", "w"),
-        indent=2,
-    )
-
-    logger.info("Computing Merkle root...")
-    leafs = [address_to_leaf(address) for address in ALLOW_LIST]
-    root = merkle_root(leafs)
+    if ALLOW_LIST_FILE is not None:
+        logger.info(f"Streaming Merkle proofs of {ALLOW_LIST_FILE}...")
+        # same leaf order as the merkle tree cache
+        root = write_proofs_jsonl(
+            sorted_addresses(read_addresses(ALLOW_LIST_FILE)), "allow_list.jsonl"
+        )
+    else:
+        logger.info("Computing Merkle tree...")
+        with MerkleTreeCache.sync(MERKLE_CACHE_DIR, ALLOW_LIST) as tree:
+            logger.info("Computing Merkle proofs...")
+            proofs = tree.proofs()
+            json.dump(
+                {
+                    hex(address): [str(p) for p in proof]
+                    for address, proof in proofs.items()
+                },
+                open("allow_list.json", "w"),
+                indent=2,
+            )
+            root = tree.root
+            write_proof_store("allow_list.bin", proofs.items(), root)
     logger.info(f"Merkle root: {root}")
 
     # %% Update first sheet
     (sheet,) = await call("Starksheet", "getSheet", 0)
-    await invoke("Sheet", "setMerkleRoot", root, address=sheet)
+    tx_hashes = [
+        await invoke("Sheet", "setMerkleRoot", root, address=sheet, wait=False)
+    ]
     (max_per_wallet,) = await call("Sheet", "getMaxPerWallet", address=sheet)
     logger.info(f"Current max per wallet: {max_per_wallet}")
     if max_per_wallet != 10:
         logger.info("Setting max per wallet to 10")
-        await invoke("Sheet", "setMaxPerWallet", 10, address=sheet)
+        tx_hashes.append(
+            await invoke("Sheet", "setMaxPerWallet", 10, address=sheet, wait=False)
+        )
+    await wait_for_transactions(tx_hashes)
     logger.info(f"Sheet {sheet} ready to be used!")
 
 
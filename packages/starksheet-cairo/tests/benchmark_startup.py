@@ -0,0 +1,112 @@
+# %% Imports
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+ROOT = Path(__file__).parents[1]
+MODULES = sorted(
+    f"utils.{path.stem}"
+    for path in (ROOT / "utils").glob("*.py")
+    if path.stem != "__init__"
+)
+REPEAT = 5
+
+
+def import_time(module):
+    """
+    Returns the cumulative import time of module, in seconds, in a fresh interpreter.
+
+    Each import runs in its own process so that no module is already loaded, and the time is
+    the one reported by python -X importtime, excluding the interpreter startup itself.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"Cannot import {module}: {output.stderr}")
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1e6
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def run(modules, repeat=REPEAT):
+    results = []
+    for module in modules:
+        times = [import_time(module) for _ in range(repeat)]
+        logger.info(
+            f"⏱️  {module}: {statistics.median(times) * 1e3:.1f}ms "
+            f"(min {min(times) * 1e3:.1f}ms)"
+        )
+        results.append(
+            {
+                "module": module,
+                "median_seconds": statistics.median(times),
+                "min_seconds": min(times),
+            }
+        )
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    """
+    Logs the import time ratio of each module of current against baseline.
+    """
+    previous = {r["module"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        reference = previous.get(result["module"])
+        if reference is None:
+            continue
+        ratio = result["median_seconds"] / reference["median_seconds"]
+        logger.info(
+            f"{'⚠️ ' if ratio > 1.2 else 'ℹ️ '} {result['module']}: time x{ratio:.2f}"
+        )
+
+
+# %% Main
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the import time of the utils modules"
+    )
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_startup.json"))
+    parser.add_argument(
+        "--baseline", type=Path, help="previous output to compare the results with"
+    )
+    args = parser.parse_args()
+
+    report = run(args.modules, args.repeat)
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info(f"✅ Results written to {args.output}")
+    if args.baseline is not None:
+        compare(json.loads(args.baseline.read_text()), report)
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# %% Imports
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from utils.merkle_proof import (
+    leaves_many,
+    merkle_proofs,
+    merkle_root,
+    merkle_verify_many,
+)
+
+from utils import pedersen
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SIZES = [1_000, 100_000, 1_000_000]
+SEED = 0
+
+
+def random_addresses(size, seed=SEED):
+    """
+    Returns size distinct random addresses, always the same for a given seed.
+    """
+    rng = random.Random(seed)
+    addresses = set()
+    while len(addresses) < size:
+        addresses.add(rng.randint(1, 2**251))
+    return sorted(addresses)
+
+
+def max_rss():
+    """
+    Returns the peak resident set size, in bytes, of this process and of its largest
+    terminated child process, e.g. a worker of the pedersen pool, since their start.
+    """
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    unit = 1 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit,
+    )
+
+
+def measure(name, size, func, *args, memory=True):
+    """
+    Runs func(*args) and returns its result together with its duration and memory usage.
+
+    A first untimed run warms the pedersen backend and worker pool up. The peak resident set
+    sizes cover the workers and the C backend, unlike tracemalloc; they are however maxima
+    since the start of the benchmark. Memory tracing slows allocations down, hence the
+    traced peak memory is measured in a last run so that it does not bias the timing.
+    """
+    func(*args)
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    # workers only count in RUSAGE_CHILDREN once terminated
+    pedersen.shutdown_executor()
+    rss, children_rss = max_rss()
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    logger.info(
+        f"⏱️  {name}({size}): {elapsed:.2f}s"
+        + (f", peak {peak / 2**20:.1f}MiB" if peak is not None else "")
+        + f", max RSS {rss / 2**20:.0f}MiB (workers {children_rss / 2**20:.0f}MiB)"
+    )
+    return result, {
+        "name": name,
+        "size": size,
+        "seconds": elapsed,
+        "peak_memory_bytes": peak,
+        "max_rss_bytes": rss,
+        "children_max_rss_bytes": children_rss,
+    }
+
+
+def run(sizes, memory=True):
+    results = []
+    for size in sizes:
+        addresses = random_addresses(size)
+        leafs, result = measure(
+            "leaves_many", size, leaves_many, addresses, memory=memory
+        )
+        results.append(result)
+        root, result = measure("merkle_root", size, merkle_root, leafs, memory=memory)
+        results.append(result)
+        proofs, result = measure(
+            "merkle_proofs", size, merkle_proofs, addresses, memory=memory
+        )
+        results.append(result)
+        verified, result = measure(
+            "merkle_verify_many",
+            size,
+            merkle_verify_many,
+            leafs,
+            root,
+            [proofs[address] for address in addresses],
+            memory=memory,
+        )
+        results.append(result)
+        if not all(verified):
+            raise ValueError(f"Some proofs failed to verify for size {size}")
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pedersen_backend": pedersen.PEDERSEN_BACKEND,
+        "pedersen_max_workers": pedersen.MAX_WORKERS,
+        "results": results,
+    }
+
+
+def compare(baseline, current):
+    """
+    Logs the duration and memory ratio of each benchmark of current against baseline.
+    """
+    previous = {(r["name"], r["size"]): r for r in baseline["results"]}
+    for result in current["results"]:
+        reference = previous.get((result["name"], result["size"]))
+        if reference is None:
+            continue
+        message = (
+            f"ℹ️  {result['name']}({result['size']}): "
+            f"time x{result['seconds'] / reference['seconds']:.2f}"
+        )
+        if result["peak_memory_bytes"] and reference["peak_memory_bytes"]:
+            message += f", memory x{result['peak_memory_bytes'] / reference['peak_memory_bytes']:.2f}"
+        if result.get("max_rss_bytes") and reference.get("max_rss_bytes"):
+            message += (
+                f", max RSS x{result['max_rss_bytes'] / reference['max_rss_bytes']:.2f}"
+            )
+        logger.info(message)
+
+
+# %% Main
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the allow list merkle utilities"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_utils.json"))
+    parser.add_argument(
+        "--baseline", type=Path, help="previous output to compare the results with"
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the traced runs measuring peak memory",
+    )
+    args = parser.parse_args()
+
+    report = run(args.sizes, memory=not args.no_memory)
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info(f"✅ Results written to {args.output}")
+    if args.baseline is not None:
+        compare(json.loads(args.baseline.read_text()), report)
+
+
+# %% Run
+if __name__ == "__main__":
+    main()
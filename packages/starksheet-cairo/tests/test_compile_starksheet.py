@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from scripts import compile_starksheet
+
+
+class _FakeCompiler:
+    """
+    Stands for utils.starknet.compile_contract, recording the compiled contracts.
+    """
+
+    def __init__(self, failing=(), duration=0.05):
+        self.failing = failing
+        self.duration = duration
+        self.compiled = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, contract):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if contract["contract_name"] in self.failing:
+                raise ValueError(b"Unexpected token")
+            time.sleep(self.duration)
+            with self.lock:
+                self.compiled.append(contract["contract_name"])
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def contracts(monkeypatch):
+    contracts = [{"contract_name": f"Contract{i}"} for i in range(6)]
+    monkeypatch.setattr(compile_starksheet, "COMPILED_CONTRACTS", contracts)
+    monkeypatch.setattr(compile_starksheet, "COMPILE_WORKERS", 3)
+    return contracts
+
+
+class TestCompileStarksheet:
+    async def test_should_compile_every_contract(self, monkeypatch, contracts):
+        compiler = _FakeCompiler()
+        monkeypatch.setattr(compile_starksheet, "compile_contract", compiler)
+        await compile_starksheet.main()
+        assert sorted(compiler.compiled) == [c["contract_name"] for c in contracts]
+        assert 1 < compiler.max_running <= 3
+
+    async def test_should_report_failures_once_all_are_done(
+        self, monkeypatch, contracts, caplog
+    ):
+        compiler = _FakeCompiler(failing=["Contract1"])
+        monkeypatch.setattr(compile_starksheet, "compile_contract", compiler)
+        with pytest.raises(RuntimeError, match="Cannot compile Contract1$"):
+            await compile_starksheet.main()
+        assert sorted(compiler.compiled) == [
+            c["contract_name"] for c in contracts if c["contract_name"] != "Contract1"
+        ]
+        messages = [record.getMessage() for record in caplog.records]
+        error = messages.index("❌ Cannot compile Contract1:\nUnexpected token")
+        assert all(
+            not message.startswith("✅ Compiled Contract")
+            for message in messages[error:]
+        )
+
+    async def test_single_worker_should_compile_serially(self, monkeypatch, contracts):
+        monkeypatch.setattr(compile_starksheet, "COMPILE_WORKERS", 1)
+        compiler = _FakeCompiler(duration=0.01)
+        monkeypatch.setattr(compile_starksheet, "compile_contract", compiler)
+        await compile_starksheet.main()
+        assert compiler.compiled == [c["contract_name"] for c in contracts]
+        assert compiler.max_running == 1
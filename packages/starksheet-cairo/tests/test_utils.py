@@ -1,12 +1,46 @@
+import asyncio
+import json
+import os
 import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
 
 import pytest
+from aiohttp import ClientResponseError, web
+from starknet_py.net.client_errors import ClientError
+from starknet_py.net.client_models import Call
+from utils.json_store import JsonStore
+from utils.merkle_cache import HEADER, MAGIC, MerkleTreeCache
 from utils.merkle_proof import (
+    MerkleTree,
     address_to_leaf,
+    hash2,
+    hash2_many,
+    leaves_many,
+    merkle_proof,
     merkle_proofs,
     merkle_root,
     merkle_verify,
+    merkle_verify_many,
 )
+from utils.merkle_stream import (
+    read_addresses,
+    sorted_addresses,
+    stream_merkle_root,
+    write_proofs_jsonl,
+)
+from utils.proof_store import ProofStore
+from utils.read_cache import BlockReadCache
+from utils.rpc_cache import RpcResultCache, bypass, cache_immutable_calls
+from utils.sessions import LoopSession
+
+from utils import constants, pedersen, rpc_limiter, rpc_metrics, rpc_pool, sessions
+from utils import starknet as starknet_utils
 
 random.seed(0)
 
@@ -21,6 +55,204 @@ def leafs(allow_list):
     return [address_to_leaf(address) for address in allow_list]
 
 
+def _naive_merkle_root(leafs):
+    if len(leafs) == 1:
+        return leafs[0]
+    if len(leafs) % 2 == 1:
+        leafs = leafs + [leafs[-1]]
+    return _naive_merkle_root([hash2(x, y) for x, y in zip(leafs[::2], leafs[1::2])])
+
+
+def _update_store(path, i):
+    JsonStore(path).update({str(i): i})
+
+
+@asynccontextmanager
+async def _stand_in_rpc(name, delay=0, status=200, respond=None):
+    """
+    Serves a local JSON-RPC endpoint answering its name to every request after delay seconds,
+    or the body returned by respond(payload) when given, sent as is when not json.
+    """
+    requests, handlers = [], set()
+
+    async def handle(request):
+        handlers.add(asyncio.current_task())
+        payload = await request.json()
+        requests.append("batch" if isinstance(payload, list) else payload["method"])
+        await asyncio.sleep(delay)
+        if respond is None:
+            body = {"jsonrpc": "2.0", "id": payload["id"], "result": name}
+        else:
+            body = respond(payload)
+        if isinstance(body, str):
+            return web.Response(text=body, status=status)
+        return web.json_response(body, status=status)
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}/", requests
+    finally:
+        # requests losing a hedge are still sleeping
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await runner.cleanup()
+
+
+async def _post(pool, method):
+    async with pool.post(
+        pool.url, json={"jsonrpc": "2.0", "method": method, "params": {}, "id": 0}
+    ) as response:
+        return (await response.json())["result"]
+
+
+def _receipt(item, status="ACCEPTED_ON_L2"):
+    return {
+        "jsonrpc": "2.0",
+        "id": item["id"],
+        "result": {"status": status, "block_number": 1},
+    }
+
+
+def _receipts(payload):
+    if isinstance(payload, list):
+        return [_receipt(item) for item in payload]
+    return _receipt(payload)
+
+
+def _not_found(payload):
+    if isinstance(payload, list):
+        return [_not_found(item) for item in payload]
+    return {
+        "jsonrpc": "2.0",
+        "id": payload["id"],
+        "error": {"code": 25, "message": "Transaction hash not found"},
+    }
+
+
+@pytest.fixture
+def rpc_url(monkeypatch):
+    """
+    Points the RPC client and session of utils.constants to the url given to the returned
+    function.
+    """
+
+    def set_url(url):
+        monkeypatch.setattr(
+            constants,
+            "_get_clients",
+            lambda: (type("Client", (), {"url": url})(), None, LoopSession()),
+        )
+
+    return set_url
+
+
+class _FakeAccount:
+    """
+    Account counting its get_nonce calls and executing transactions at the nonce of the chain,
+    the execute calls whose index is in fail_on raising.
+    """
+
+    def __init__(self, address, fail_on=()):
+        self.address = address
+        self.fail_on = set(fail_on)
+        self.nonce_calls = 0
+        self.executions = 0
+        self.executed = []
+        self.cairo_versions = []
+
+    async def get_nonce(self):
+        self.nonce_calls += 1
+        await asyncio.sleep(0)
+        return len(self.executed)
+
+    async def execute(self, calls, max_fee, nonce, cairo_version=0):
+        await asyncio.sleep(0)
+        self.executions += 1
+        if self.executions - 1 in self.fail_on:
+            raise ValueError("Transaction rejected")
+        self.executed.append((nonce, calls))
+        self.cairo_versions.append(cairo_version)
+        return type("Response", (), {"transaction_hash": 0x100 + nonce})()
+
+
+class _FakeClient:
+    """
+    Node answering each call with its address and calldata, and Multicall.aggregate calls at
+    address 0x99 as the contract does, raising error for aggregates of more than max_calls.
+    """
+
+    def __init__(self, max_calls=None, error=None):
+        self.max_calls = max_calls
+        self.error = error
+        self.requests = 0
+
+    async def call_contract(self, call, block_number=None):
+        self.requests += 1
+        if call.to_addr != 0x99:
+            return [call.to_addr, *call.calldata]
+        n_calls = call.calldata[0]
+        call_array = call.calldata[1 : 1 + 4 * n_calls]
+        data = call.calldata[2 + 4 * n_calls :]
+        if self.max_calls is not None and n_calls > self.max_calls:
+            raise self.error
+        retdata = []
+        for i in range(n_calls):
+            to_addr, _, offset, size = call_array[4 * i : 4 * i + 4]
+            result = [to_addr, *data[offset : offset + size]]
+            retdata += [len(result), *result]
+        return [block_number or 0, len(retdata), *retdata]
+
+
+@pytest.fixture
+def account_probes(monkeypatch, tmp_path):
+    """
+    Points get_starknet_account to a node recording its probes of the account, with the
+    accounts cache enabled in tmp_path.
+    """
+    from starknet_py.net.models import StarknetChainId
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+    probes = []
+
+    async def get_public_key(address):
+        probes.append("get_public_key")
+        return KeyPair.from_private_key(1).public_key
+
+    async def get_class_hash_at(address):
+        probes.append("get_class_hash_at")
+        return 0x1
+
+    async def get_class_by_hash(class_hash):
+        probes.append("get_class_by_hash")
+        return None
+
+    client = type(
+        "Client",
+        (),
+        {
+            "get_class_hash_at": staticmethod(get_class_hash_at),
+            "get_class_by_hash": staticmethod(get_class_by_hash),
+        },
+    )()
+    monkeypatch.setattr(constants, "_get_clients", lambda: (client, None, None))
+    monkeypatch.setattr(starknet_utils, "_get_public_key", get_public_key)
+    monkeypatch.setattr(starknet_utils, "_accounts", {})
+    monkeypatch.setattr(starknet_utils, "_cairo_versions", {})
+    monkeypatch.setattr(starknet_utils, "ACCOUNTS_CACHE", True)
+    monkeypatch.setattr(starknet_utils, "CACHE_DIR", tmp_path)
+    monkeypatch.setitem(constants.NETWORK, "name", "starknet-devnet")
+    monkeypatch.setitem(constants.NETWORK, "rpc_url", "http://127.0.0.1:5050/rpc")
+    monkeypatch.setitem(constants.NETWORK, "chain_id", StarknetChainId.TESTNET)
+    return probes
+
+
 class TestUtils:
     class TestMerkleUtils:
         def test_utils_should_be_consistents(self, allow_list, leafs):
@@ -30,3 +262,1054 @@ class TestUtils:
                 merkle_verify(address_to_leaf(address), root, proofs[address])
                 for address in allow_list
             } == {True}
+
+        def test_verify_many_should_match_verify(self, allow_list, leafs):
+            root = merkle_root(leafs)
+            proofs = merkle_proofs(allow_list)
+            proofs[allow_list[3]] = proofs[allow_list[4]]
+            assert merkle_verify_many(
+                leafs, root, [proofs[address] for address in allow_list]
+            ) == [
+                merkle_verify(leaf, root, proofs[address])
+                for leaf, address in zip(leafs, allow_list)
+            ]
+            assert merkle_verify_many(leafs, root, [proofs[allow_list[0]]] * 2) == [
+                True,
+                False,
+            ]
+
+        @pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13])
+        def test_tree_should_match_naive_build(self, size):
+            addresses = [random.randint(0, 2**250) for _ in range(size)]
+            leafs = [address_to_leaf(address) for address in addresses]
+            tree = MerkleTree.from_addresses(addresses)
+            assert tree.root == merkle_root(leafs) == _naive_merkle_root(leafs)
+            for address in addresses:
+                assert tree.proof(address) == merkle_proof(address, addresses)
+                assert merkle_verify(
+                    address_to_leaf(address), tree.root, tree.proof(address)
+                )
+
+        @pytest.mark.parametrize("size", [1, 4, 5, 13, 30])
+        @pytest.mark.parametrize("shard_size", [1, 4, 8])
+        def test_sharded_tree_should_match_sequential_build(
+            self, monkeypatch, allow_list, leafs, size, shard_size
+        ):
+            monkeypatch.setattr(pedersen, "MIN_PARALLEL_BATCH", 1)
+            monkeypatch.setattr(pedersen, "MAX_WORKERS", 2)
+            tree = MerkleTree(leafs[:size], allow_list[:size])
+            sharded = MerkleTree.sharded(
+                leafs[:size], allow_list[:size], shard_size=shard_size
+            )
+            assert sharded.levels == tree.levels
+            assert sharded.proofs() == tree.proofs()
+
+        def test_tree_should_raise_for_unknown_address(self, allow_list):
+            with pytest.raises(ValueError):
+                merkle_proof(-1, allow_list)
+
+    class TestPedersen:
+        def test_leaves_many_should_match_address_to_leaf(self, allow_list, leafs):
+            assert leaves_many(allow_list) == leafs
+
+        def test_hash2_many_should_match_hash2_in_process_pool(
+            self, monkeypatch, allow_list
+        ):
+            monkeypatch.setattr(pedersen, "MIN_PARALLEL_BATCH", 4)
+            monkeypatch.setattr(pedersen, "MAX_WORKERS", 2)
+            xs, ys = allow_list[::2], allow_list[1::2]
+            assert hash2_many(xs, ys) == [hash2(x, y) for x, y in zip(xs, ys)]
+
+    class TestMerkleTreeCache:
+        def test_cache_should_match_tree_of_sorted_addresses(
+            self, tmp_path, allow_list
+        ):
+            with MerkleTreeCache.sync(tmp_path, allow_list) as cache:
+                tree = MerkleTree.from_addresses(sorted(allow_list))
+                assert cache.root == tree.root
+                assert cache.proofs() == tree.proofs()
+
+        def test_cache_should_update_incrementally(self, tmp_path, allow_list):
+            MerkleTreeCache.sync(tmp_path, allow_list[:20]).close()
+            updated = allow_list[5:] + [random.randint(0, 2**250) for _ in range(40)]
+            with MerkleTreeCache.sync(tmp_path, updated) as cache:
+                assert len(list(tmp_path.glob("*.tree"))) == 1
+                assert cache.indexes.keys() == set(updated)
+                assert sorted(cache.indexes, key=cache.indexes.get) == sorted(updated)
+                assert cache.root == merkle_root(leaves_many(sorted(updated)))
+                assert {
+                    merkle_verify(address_to_leaf(address), cache.root, proof)
+                    for address, proof in cache.proofs().items()
+                } == {True}
+
+        def test_cache_root_should_only_depend_on_address_set(
+            self, tmp_path, allow_list
+        ):
+            addresses = set(allow_list[:10])
+            MerkleTreeCache.sync(tmp_path, addresses).close()
+            for step in range(12):
+                removed = set(random.sample(sorted(addresses), min(3, len(addresses))))
+                added = {random.randint(0, 2**250) for _ in range(step % 4)}
+                addresses = (addresses - removed) | added
+                with MerkleTreeCache.sync(tmp_path, addresses) as cache:
+                    tree = MerkleTree.from_addresses(sorted(addresses))
+                    assert cache.root == tree.root
+                    assert cache.proofs() == tree.proofs()
+            addresses.update(allow_list)
+            with MerkleTreeCache.sync(tmp_path, addresses) as cache:
+                assert cache.root == MerkleTree.from_addresses(sorted(addresses)).root
+
+        def test_outdated_cache_should_be_rebuilt(self, tmp_path, allow_list):
+            MerkleTreeCache.sync(tmp_path, allow_list[:20]).close()
+            (outdated,) = tmp_path.glob("*.tree")
+            with open(outdated, "r+b") as f:
+                f.write(HEADER.pack(MAGIC, 1, 0, 0))
+            with MerkleTreeCache.sync(tmp_path, allow_list[:20]) as cache:
+                assert (
+                    cache.root
+                    == MerkleTree.from_addresses(sorted(allow_list[:20])).root
+                )
+            assert list(tmp_path.glob("*.tree")) == [outdated]
+
+        def test_interrupted_update_should_keep_previous_cache(
+            self, tmp_path, allow_list, monkeypatch
+        ):
+            with MerkleTreeCache.sync(tmp_path, allow_list[:20]) as cache:
+                root = cache.root
+            previous = list(tmp_path.iterdir())
+
+            def interrupt(self, dirty):
+                raise KeyboardInterrupt
+
+            monkeypatch.setattr(MerkleTreeCache, "_rehash", interrupt)
+            with pytest.raises(KeyboardInterrupt):
+                MerkleTreeCache.sync(tmp_path, allow_list)
+            assert list(tmp_path.iterdir()) == previous
+            monkeypatch.undo()
+            with MerkleTreeCache.sync(tmp_path, allow_list[:20]) as cache:
+                assert cache.indexes.keys() == set(allow_list[:20])
+                assert cache.root == root
+
+    class TestMerkleStream:
+        @pytest.mark.parametrize("size", [0, 1, 2, 3, 7, 16, 29])
+        def test_stream_root_should_match_merkle_root(self, allow_list, size):
+            addresses = allow_list[:size]
+            assert stream_merkle_root(iter(addresses)) == merkle_root(
+                leaves_many(addresses)
+            )
+
+        def test_jsonl_proofs_should_match_tree(self, tmp_path, allow_list):
+            source = tmp_path / "allow_list.txt"
+            source.write_text("\n".join(hex(address) for address in allow_list))
+            output = tmp_path / "allow_list.jsonl"
+            root = write_proofs_jsonl(read_addresses(source), output)
+            tree = MerkleTree.from_addresses(allow_list)
+            assert root == tree.root
+            lines = [json.loads(line) for line in output.read_text().splitlines()]
+            assert [int(line["address"], 16) for line in lines] == allow_list
+            assert {
+                line["address"]: [int(p) for p in line["proof"]] for line in lines
+            } == {hex(address): proof for address, proof in tree.proofs().items()}
+
+        @pytest.mark.parametrize("chunk_size", [1, 4, 100])
+        def test_sorted_addresses_should_sort_and_deduplicate(
+            self, tmp_path, allow_list, chunk_size
+        ):
+            addresses = allow_list + allow_list[::3]
+            random.shuffle(addresses)
+            assert list(
+                sorted_addresses(iter(addresses), tmp_path, chunk_size)
+            ) == sorted(set(allow_list))
+            assert list(tmp_path.iterdir()) == []
+
+        def test_sorted_stream_root_should_match_cache_root(self, tmp_path, allow_list):
+            output = tmp_path / "allow_list.jsonl"
+            root = write_proofs_jsonl(sorted_addresses(iter(allow_list)), output)
+            with MerkleTreeCache.sync(tmp_path / "cache", allow_list) as cache:
+                assert root == cache.root
+
+    class TestProofStore:
+        @pytest.mark.parametrize("size", [1, 2, 30])
+        def test_store_should_return_tree_proofs(self, tmp_path, allow_list, size):
+            tree = MerkleTree.from_addresses(allow_list[:size])
+            tree.dump_proofs(tmp_path / "allow_list.bin")
+            with ProofStore(tmp_path / "allow_list.bin") as store:
+                assert len(store) == size
+                assert store.root == tree.root
+                for address in allow_list[:size]:
+                    assert store.proof(address) == tree.proof(address)
+                other = max(allow_list) + 1
+                assert other not in store
+                with pytest.raises(ValueError):
+                    store.proof(other)
+
+    class TestJsonStore:
+        def test_update_should_merge_entries(self, tmp_path):
+            JsonStore(tmp_path / "deployments.json").update({"a": 1})
+            store = JsonStore(tmp_path / "deployments.json")
+            assert store.update({"b": 2}) == {"a": 1, "b": 2}
+            assert json.loads((tmp_path / "deployments.json").read_text()) == {
+                "a": 1,
+                "b": 2,
+            }
+
+        def test_update_should_replace_entries(self, tmp_path):
+            store = JsonStore(tmp_path / "deployments.json")
+            store.update({"a": 1, "b": 2})
+            assert store.update({"b": 3}, replace=True) == {"b": 3}
+            assert JsonStore(tmp_path / "deployments.json").get() == {"b": 3}
+
+        def test_dump_should_drop_removed_deployments(self, tmp_path, monkeypatch):
+            store = JsonStore(tmp_path / "deployments.json")
+            monkeypatch.setattr(starknet_utils, "_deployments", store)
+            deployment = {"address": 1, "tx": 2, "artifact": tmp_path / "a.json"}
+            starknet_utils.dump_deployments({"a": deployment, "b": deployment})
+            starknet_utils.dump_deployments({"c": deployment})
+            assert starknet_utils.get_deployments().keys() == {"a", "b", "c"}
+            starknet_utils.dump_deployments({"a": deployment}, replace=True)
+            assert starknet_utils.get_deployments() == {
+                "a": {
+                    "address": "0x1",
+                    "tx": "0x2",
+                    "artifact": str(tmp_path / "a.json"),
+                }
+            }
+
+        def test_get_should_reload_changed_file(self, tmp_path):
+            store = JsonStore(tmp_path / "deployments.json")
+            assert store.get() == {}
+            JsonStore(tmp_path / "deployments.json").update({"a": 1})
+            assert store.get() == {"a": 1}
+
+        def test_concurrent_updates_should_not_lose_entries(self, tmp_path):
+            with ProcessPoolExecutor(4) as executor:
+                list(
+                    executor.map(
+                        _update_store, [tmp_path / "deployments.json"] * 32, range(32)
+                    )
+                )
+            assert JsonStore(tmp_path / "deployments.json").get() == {
+                str(i): i for i in range(32)
+            }
+
+    class TestRpcMetrics:
+        @pytest.fixture(autouse=True)
+        def histograms(self, monkeypatch):
+            monkeypatch.setattr(rpc_metrics, "_histograms", {})
+
+        @pytest.mark.parametrize(
+            "url, payload, method",
+            [
+                ("http://rpc", {"method": "starknet_call"}, "starknet_call"),
+                (
+                    "http://rpc",
+                    [{"method": "starknet_getTransactionReceipt"}],
+                    "batch:starknet_getTransactionReceipt",
+                ),
+                ("https://gateway/feeder_gateway/get_block", None, "get_block"),
+            ],
+        )
+        def test_method_name(self, url, payload, method):
+            assert rpc_metrics.method_name(url, payload) == method
+
+        def test_record_should_fill_histogram(self):
+            rpc_metrics.record("starknet_call", 0.003, 10, 20)
+            rpc_metrics.record("starknet_call", 0.2, 10, 20, error="JsonRpcError")
+            rpc_metrics.record("starknet_call", 100)
+            histogram = rpc_metrics.snapshot()["starknet_call"]
+            assert histogram["count"] == 3
+            assert histogram["buckets"]["0.005"] == 1
+            assert histogram["buckets"]["0.25"] == 1
+            assert histogram["buckets"]["+Inf"] == 1
+            assert histogram["errors"] == {"JsonRpcError": 1}
+            assert histogram["bytes_sent"] == 20
+
+        @pytest.mark.parametrize(
+            "status, body, error",
+            [
+                (200, b'{"jsonrpc": "2.0", "id": 0, "result": ["0x1"]}', None),
+                (
+                    200,
+                    b'{"jsonrpc": "2.0", "id": 0, "error": {"code": 20}}',
+                    "JsonRpcError",
+                ),
+                (
+                    200,
+                    b'{"id": 0, "result": {"revert_error": "", "error": null}}',
+                    None,
+                ),
+                (200, b'[{"id": 0, "error": {"code": 25}}]', None),
+                (200, b'{"error": ', None),
+                (200, b"", None),
+                (503, b"", "HTTP503"),
+            ],
+        )
+        def test_response_error(self, status, body, error):
+            assert rpc_metrics.response_error(status, body) == error
+
+        def test_to_prometheus_should_be_cumulative(self):
+            rpc_metrics.record("starknet_call", 0.003)
+            rpc_metrics.record("starknet_call", 0.2)
+            text = rpc_metrics.to_prometheus()
+            assert (
+                'starksheet_rpc_request_duration_seconds_bucket{method="starknet_call",le="0.25"} 2'
+                in text
+            )
+            assert (
+                'starksheet_rpc_request_duration_seconds_count{method="starknet_call"} 2'
+                in text
+            )
+
+        def test_dump_json(self, tmp_path):
+            rpc_metrics.record("starknet_call", 0.003)
+            rpc_metrics.dump(tmp_path / "metrics.json")
+            assert (
+                json.loads((tmp_path / "metrics.json").read_text())["starknet_call"][
+                    "count"
+                ]
+                == 1
+            )
+
+    class TestRpcResultCache:
+        def test_should_store_classes(self, tmp_path):
+            cache = RpcResultCache(tmp_path, lambda: 1)
+            params = {"class_hash": "0x1", "block_id": "pending"}
+            assert cache.get("getClass", params) is None
+            cache.put("getClass", params, {"abi": []})
+            assert cache.get("getClass", {"class_hash": "0x1"}) == {"abi": []}
+
+        def test_should_key_by_chain_id(self, tmp_path):
+            RpcResultCache(tmp_path, lambda: 1).put(
+                "getClass", {"class_hash": "0x1"}, {"abi": []}
+            )
+            assert (
+                RpcResultCache(tmp_path, lambda: 2).get(
+                    "getClass", {"class_hash": "0x1"}
+                )
+                is None
+            )
+
+        @pytest.mark.parametrize(
+            "receipt, cached",
+            [
+                ({"status": "ACCEPTED_ON_L2"}, False),
+                ({"status": "ACCEPTED_ON_L1"}, True),
+                ({"finality_status": "ACCEPTED_ON_L1"}, True),
+                ({"status": "REJECTED"}, True),
+            ],
+        )
+        def test_should_only_store_finalized_receipts(self, tmp_path, receipt, cached):
+            cache = RpcResultCache(tmp_path, lambda: 1)
+            params = {"transaction_hash": "0x1"}
+            cache.put("getTransactionReceipt", params, receipt)
+            assert (cache.get("getTransactionReceipt", params) is not None) == cached
+
+        def test_should_not_cache_other_methods(self, tmp_path):
+            cache = RpcResultCache(tmp_path, lambda: 1)
+            assert not cache.is_cacheable("getClassAt", {"contract_address": "0x1"})
+            assert not RpcResultCache(tmp_path, lambda: None).is_cacheable(
+                "getClass", {"class_hash": "0x1"}
+            )
+
+        async def test_should_bypass_the_cache(self, tmp_path):
+            sent = []
+
+            async def call(method_name, params):
+                sent.append(method_name)
+                return {"abi": []}
+
+            client = type("Client", (), {})()
+            client._client = type("HttpClient", (), {"call": staticmethod(call)})()
+            cache_immutable_calls(client, RpcResultCache(tmp_path, lambda: 1))
+            params = {"class_hash": "0x1"}
+            await client._client.call("getClass", params)
+            await client._client.call("getClass", params)
+            assert len(sent) == 1
+            with bypass():
+                await client._client.call("getClass", params)
+            assert len(sent) == 2
+
+        async def test_should_resolve_chain_id_off_the_loop(self, tmp_path):
+            threads = []
+
+            def chain_id():
+                threads.append(threading.get_ident())
+                return 1
+
+            async def call(method_name, params):
+                return {"abi": []}
+
+            client = type("Client", (), {})()
+            client._client = type("HttpClient", (), {"call": staticmethod(call)})()
+            cache_immutable_calls(client, RpcResultCache(tmp_path, chain_id))
+            await client._client.call("getClass", {"class_hash": "0x1"})
+            await client._client.call("getClass", {"class_hash": "0x2"})
+            assert len(threads) == 1
+            assert threads[0] != threading.get_ident()
+
+        def test_should_key_networks_apart(self, monkeypatch):
+            monkeypatch.setitem(constants.NETWORK, "name", "starknet-devnet")
+            monkeypatch.setitem(
+                constants.NETWORK, "rpc_url", "http://127.0.0.1:5050/rpc"
+            )
+            devnet = constants.get_network_key()
+            monkeypatch.setitem(constants.NETWORK, "name", "testnet")
+            monkeypatch.setitem(constants.NETWORK, "rpc_url", "https://goerli/rpc")
+            assert constants.get_network_key() != devnet
+            assert "goerli" not in constants.get_network_key()
+
+    class TestConstants:
+        def test_import_should_not_send_requests(self):
+            script = "\n".join(
+                [
+                    "import socket",
+                    "import requests",
+                    "def fail(*args, **kwargs):",
+                    "    raise AssertionError(f'request sent on import: {args}')",
+                    "socket.socket.connect = socket.create_connection = fail",
+                    "requests.Session.request = fail",
+                    "from utils import constants",
+                    "constants.NETWORK, constants.get_network_key()",
+                ]
+            )
+            subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=Path(__file__).parents[1],
+                check=True,
+            )
+
+        async def test_chain_id_should_be_fetched_off_the_loop(self, monkeypatch):
+            from starknet_py.net.models import StarknetChainId
+
+            threads = []
+
+            def fetch_chain_id():
+                threads.append(threading.get_ident())
+                return StarknetChainId.TESTNET.value
+
+            monkeypatch.setattr(constants, "_fetch_chain_id", fetch_chain_id)
+            monkeypatch.setitem(constants.NETWORK, "chain_id", None)
+            assert await constants.get_chain_id_async() == StarknetChainId.TESTNET
+            assert await constants.get_chain_id_async() == StarknetChainId.TESTNET
+            assert len(threads) == 1
+            assert threads[0] != threading.get_ident()
+
+    class TestBlockReadCache:
+        def test_should_key_by_calldata_and_block(self):
+            cache = BlockReadCache()
+            cache.observe(10)
+            cache.put(Call(to_addr=1, selector=2, calldata=[3]), 10, [4])
+            assert cache.get(Call(to_addr=1, selector=2, calldata=[3]), 10) == [4]
+            assert cache.get(Call(to_addr=1, selector=2, calldata=[5]), 10) is None
+            assert cache.get(Call(to_addr=1, selector=2, calldata=[3]), 11) is None
+
+        def test_should_drop_entries_on_new_block(self):
+            cache = BlockReadCache()
+            call = Call(to_addr=1, selector=2, calldata=[])
+            cache.observe(10)
+            cache.put(call, 10, [4])
+            cache.observe(9)
+            assert cache.get(call, 10) == [4]
+            cache.observe(11)
+            assert cache.get(call, 10) is None
+            assert len(cache) == 0
+
+        def test_should_not_store_superseded_blocks(self):
+            cache = BlockReadCache()
+            call = Call(to_addr=1, selector=2, calldata=[])
+            cache.observe(11)
+            cache.put(call, 10, [4])
+            assert cache.get(call, 10) is None
+
+    class TestEndpointPool:
+        async def test_should_hedge_slow_reads(self, monkeypatch):
+            monkeypatch.setattr(rpc_pool, "RPC_HEDGE_DEFAULT_DELAY", 0.05)
+            async with _stand_in_rpc("slow", delay=1) as (slow, _), _stand_in_rpc(
+                "fast"
+            ) as (fast, _):
+                pool = rpc_pool.EndpointPool([slow, fast])
+                start = time.perf_counter()
+                assert await _post(pool, "starknet_call") == "fast"
+                assert time.perf_counter() - start < 0.5
+
+        async def test_should_not_hedge_transactions(self, monkeypatch):
+            monkeypatch.setattr(rpc_pool, "RPC_HEDGE_DEFAULT_DELAY", 0.05)
+            async with _stand_in_rpc("slow", delay=0.2) as (slow, _,), _stand_in_rpc(
+                "fast"
+            ) as (fast, requests):
+                pool = rpc_pool.EndpointPool([slow, fast])
+                result = await _post(pool, "starknet_addInvokeTransaction")
+                assert result == "slow"
+                assert requests == []
+
+        async def test_should_fail_over(self):
+            async with _stand_in_rpc("down", status=503) as (down, _,), _stand_in_rpc(
+                "up"
+            ) as (up, _):
+                pool = rpc_pool.EndpointPool([down, up])
+                assert await _post(pool, "starknet_call") == "up"
+
+        def test_should_drop_failing_endpoints(self):
+            pool = rpc_pool.EndpointPool(["a", "b"])
+            for _ in range(rpc_pool.RPC_UNHEALTHY_FAILURES):
+                pool.record(pool.endpoints[0], 1, ok=False)
+            assert [e.url for e in pool.rotation()] == ["b"]
+            # the last healthy endpoint is kept whatever happens
+            for _ in range(rpc_pool.RPC_UNHEALTHY_FAILURES):
+                pool.record(pool.endpoints[1], 1, ok=False)
+            assert [e.url for e in pool.rotation()] == ["b"]
+
+        def test_should_drop_slow_endpoints(self):
+            now = [0]
+            pool = rpc_pool.EndpointPool(["a", "b"], clock=lambda: now[0])
+            for _ in range(rpc_pool.MIN_SAMPLES):
+                pool.record(pool.endpoints[1], 0.01, ok=True)
+            for _ in range(rpc_pool.MIN_SAMPLES):
+                pool.record(pool.endpoints[0], 1, ok=True)
+            assert [e.url for e in pool.rotation()] == ["b"]
+            # back from its cooldown, the endpoint only gets hedges until measured again
+            now[0] = rpc_pool.RPC_UNHEALTHY_COOLDOWN + 1
+            assert [e.url for e in pool.rotation()] == ["b", "a"]
+
+        def test_should_put_unmeasured_endpoints_last(self):
+            pool = rpc_pool.EndpointPool(["a", "b", "c"])
+            assert [e.url for e in pool.rotation()] == ["a", "b", "c"]
+            for _ in range(rpc_pool.MIN_SAMPLES):
+                pool.record(pool.endpoints[2], 0.1, ok=True)
+            assert [e.url for e in pool.rotation()] == ["c", "a", "b"]
+
+    class TestAimdLimiter:
+        def test_should_increase_additively(self):
+            limiter = rpc_limiter.AimdLimiter(initial=4, maximum=5)
+            for _ in range(4):
+                limiter.in_flight += 1
+                limiter.release(0.1)
+            assert int(limiter.limit) == 4
+            for _ in range(20):
+                limiter.in_flight += 1
+                limiter.release(0.1)
+            assert limiter.limit == 5
+
+        def test_should_not_increase_on_slow_responses(self):
+            limiter = rpc_limiter.AimdLimiter(initial=4, latency_factor=2)
+            limiter.in_flight += 2
+            limiter.release(0.1)
+            limit = limiter.limit
+            limiter.release(1)
+            assert limiter.limit == limit
+
+        def test_should_decrease_once_per_round_trip(self):
+            now = [0]
+            limiter = rpc_limiter.AimdLimiter(
+                initial=8, minimum=1, backoff=0.5, clock=lambda: now[0]
+            )
+            limiter.in_flight += 4
+            limiter.release(1, overloaded=True)
+            limiter.release(1, overloaded=True)
+            assert limiter.limit == 4
+            now[0] = 2
+            limiter.release(1, overloaded=True)
+            now[0] = 4
+            limiter.release(1, overloaded=True)
+            assert limiter.limit == 1
+
+        async def test_should_bound_requests_in_flight(self):
+            limiter = rpc_limiter.AimdLimiter(initial=1)
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+            limiter.release()
+            await asyncio.wait_for(waiter, 1)
+            assert limiter.in_flight == 1
+
+        async def test_should_cut_limit_on_rate_limits(self, monkeypatch):
+            limiter = rpc_limiter.AimdLimiter(initial=8)
+            monkeypatch.setattr(rpc_limiter, "limiter", limiter)
+            async with _stand_in_rpc("limited", status=429) as (url, _):
+                await _post(rpc_pool.EndpointPool([url]), "starknet_call")
+            assert limiter.limit == 4 and limiter.in_flight == 0
+
+    class TestSessions:
+        @staticmethod
+        def _run(coroutine):
+            # as asyncio.run, without unsetting the event loop of the test session
+            loop = asyncio.new_event_loop()
+            try:
+                return loop.run_until_complete(coroutine)
+            finally:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.close()
+
+        def test_session_should_be_shared(self):
+            assert sessions.get_session() is sessions.get_session()
+
+        async def test_async_session_should_be_shared_within_a_loop(self):
+            assert sessions.get_async_session() is sessions.get_async_session()
+            assert not sessions.get_async_session().closed
+
+        def test_loop_session_should_follow_the_running_loop(self):
+            loop_session = sessions.LoopSession()
+
+            async def chain_id():
+                async with _stand_in_rpc("node") as (url, _):
+                    async with loop_session.post(
+                        url,
+                        json={
+                            "jsonrpc": "2.0",
+                            "method": "starknet_chainId",
+                            "params": [],
+                            "id": 0,
+                        },
+                    ) as response:
+                        result = (await response.json())["result"]
+                return result, asyncio.get_running_loop(), sessions.get_async_session()
+
+            (first, first_loop, first_session), (second, _, second_session) = [
+                self._run(chain_id()) for _ in range(2)
+            ]
+            assert first == second == "node"
+            assert first_session is not second_session
+            # the sessions are closed with their loop and forgotten afterwards
+            assert first_session.closed and second_session.closed
+            assert first_loop not in sessions._async_sessions
+
+    class TestWaitForTransaction:
+        async def test_should_wait_concurrently(self, rpc_url):
+            async with _stand_in_rpc("node", delay=0.1, respond=_receipts) as (url, _):
+                rpc_url(url)
+                start = time.perf_counter()
+                statuses = await asyncio.gather(
+                    *[
+                        starknet_utils.wait_for_transaction(
+                            transaction_hash, check_interval=0.05, max_wait=5
+                        )
+                        for transaction_hash in range(1, 11)
+                    ]
+                )
+            assert [status.value for status in statuses] == ["ACCEPTED_ON_L2"] * 10
+            # one after the other, the waits would take 10 * 0.15s
+            assert time.perf_counter() - start < 1
+
+        async def test_should_back_off_until_max_wait(self, rpc_url):
+            async with _stand_in_rpc("node", respond=_not_found) as (url, requests):
+                rpc_url(url)
+                start = time.perf_counter()
+                status = await starknet_utils.wait_for_transaction(
+                    1, check_interval=0.01, backoff_factor=2, max_wait=0.5
+                )
+            assert status is None
+            assert 0.5 <= time.perf_counter() - start < 1
+            # 0.01, 0.02, 0.04, 0.08, 0.16 then the remaining 0.19s, instead of 50 polls
+            assert len(requests) <= 7
+
+    class TestReceiptPoller:
+        async def test_should_batch_receipts(self, rpc_url):
+            async with _stand_in_rpc(
+                "node", respond=lambda payload: [_receipt(item) for item in payload]
+            ) as (url, requests):
+                rpc_url(url)
+                statuses = await asyncio.gather(
+                    *[
+                        starknet_utils.wait_for_transaction(
+                            transaction_hash, check_interval=0.01, max_wait=1
+                        )
+                        for transaction_hash in range(1, 4)
+                    ]
+                )
+            assert [status.value for status in statuses] == ["ACCEPTED_ON_L2"] * 3
+            assert requests == ["batch"]
+
+        async def test_should_retry_on_errors(self, rpc_url):
+            responses = iter(["rate limited", {"error": {"code": 429}}])
+
+            def respond(payload):
+                if isinstance(payload, dict):
+                    return _receipt(payload)
+                return next(responses, None) or [_receipt(item) for item in payload]
+
+            async with _stand_in_rpc("node", respond=respond) as (url, requests):
+                rpc_url(url)
+                status = await starknet_utils.wait_for_transaction(
+                    1, check_interval=0.01, max_wait=1
+                )
+            assert status.value == "ACCEPTED_ON_L2"
+            # the error object falls back to a request per hash
+            assert requests == ["batch", "batch", "starknet_getTransactionReceipt"]
+
+        async def test_should_stop_batching_when_unsupported(self, rpc_url):
+            polls = []
+
+            def respond(payload):
+                if isinstance(payload, list):
+                    return {"error": {"code": 22, "message": "batches unsupported"}}
+                polls.append(payload)
+                return _receipt(
+                    payload, "ACCEPTED_ON_L2" if len(polls) > 2 else "RECEIVED"
+                )
+
+            async with _stand_in_rpc("node", respond=respond) as (url, requests):
+                rpc_url(url)
+                status = await starknet_utils.wait_for_transaction(
+                    1, check_interval=0.01, max_wait=1
+                )
+            assert status.value == "ACCEPTED_ON_L2"
+            assert requests == ["batch"] + ["starknet_getTransactionReceipt"] * 3
+
+        async def test_should_raise_http_errors(self, rpc_url):
+            async with _stand_in_rpc(
+                "node", status=500, respond=lambda payload: "Internal Server Error"
+            ) as (url, _):
+                rpc_url(url)
+                with pytest.raises(ClientResponseError) as error:
+                    await starknet_utils.wait_for_transaction(
+                        1, check_interval=0.01, max_wait=0.05
+                    )
+            assert error.value.status == 500
+
+        async def test_should_fail_past_deadline_only(self, rpc_url):
+            started = time.perf_counter()
+
+            def respond(payload):
+                if time.perf_counter() - started < 0.3:
+                    return "rate limited"
+                return [_receipt(item) for item in payload]
+
+            async with _stand_in_rpc("node", respond=respond) as (url, _):
+                rpc_url(url)
+                short, long = await asyncio.gather(
+                    starknet_utils.wait_for_transaction(
+                        1, check_interval=0.05, backoff_factor=1, max_wait=0.1
+                    ),
+                    starknet_utils.wait_for_transaction(
+                        2, check_interval=0.05, backoff_factor=1, max_wait=5
+                    ),
+                    return_exceptions=True,
+                )
+            assert isinstance(short, json.JSONDecodeError)
+            assert long.value == "ACCEPTED_ON_L2"
+
+    class TestInvokeMany:
+        @staticmethod
+        def _calls(*sizes):
+            return [
+                (index, Call(to_addr=index, selector=0, calldata=[0] * size))
+                for index, size in enumerate(sizes)
+            ]
+
+        def test_should_split_by_max_calls(self):
+            batches = starknet_utils._pack_calls(self._calls(0, 0, 0, 0, 0), 2, 1000)
+            assert [[index for index, _ in batch] for batch in batches] == [
+                [0, 1],
+                [2, 3],
+                [4],
+            ]
+
+        def test_should_split_by_max_calldata(self):
+            # each call takes its calldata and 4 felts of the __execute__ calldata
+            batches = starknet_utils._pack_calls(self._calls(6, 6, 6, 6), 50, 25)
+            assert [len(batch) for batch in batches] == [2, 2]
+
+        def test_should_send_oversized_call_alone(self):
+            batches = starknet_utils._pack_calls(self._calls(1, 100, 1), 50, 25)
+            assert [[index for index, _ in batch] for batch in batches] == [
+                [0],
+                [1],
+                [2],
+            ]
+
+        async def test_should_map_outcomes(self, monkeypatch):
+            from starknet_py.net.client_models import TransactionStatus
+
+            async def wait_for_transactions(transaction_hashes, account=None):
+                return [TransactionStatus.ACCEPTED_ON_L2] * len(transaction_hashes)
+
+            monkeypatch.setattr(
+                starknet_utils, "wait_for_transactions", wait_for_transactions
+            )
+            account = _FakeAccount(0x16, fail_on=[1])
+            outcomes = await starknet_utils.invoke_many(
+                [(0x1, f"f{i}", [i]) for i in range(5)], account=account, max_calls=2
+            )
+            assert [outcome["function"] for outcome in outcomes] == [
+                f"f{i}" for i in range(5)
+            ]
+            assert [outcome["tx"] for outcome in outcomes] == [
+                0x100,
+                0x100,
+                None,
+                None,
+                0x101,
+            ]
+            assert [outcome["status"] for outcome in outcomes] == [
+                TransactionStatus.ACCEPTED_ON_L2,
+                TransactionStatus.ACCEPTED_ON_L2,
+                None,
+                None,
+                TransactionStatus.ACCEPTED_ON_L2,
+            ]
+            assert [outcome["error"] for outcome in outcomes] == [
+                None,
+                None,
+                "Transaction rejected",
+                "Transaction rejected",
+                None,
+            ]
+            # the nonce is resynced after the failed batch
+            assert account.nonce_calls == 2
+
+    class TestGetStarknetAccount:
+        async def test_should_memoize_accounts(self, account_probes):
+            account = await starknet_utils.get_starknet_account("0x1234", "0x1")
+            assert await starknet_utils.get_starknet_account("0x1234", "0x1") is account
+            assert account.address == 0x1234
+            assert account_probes == [
+                "get_public_key",
+                "get_class_hash_at",
+                "get_class_by_hash",
+            ]
+
+        async def test_should_persist_accounts(self, account_probes, monkeypatch):
+            await starknet_utils.get_starknet_account("0x1234", "0x1")
+            monkeypatch.setattr(starknet_utils, "_accounts", {})
+            monkeypatch.setattr(starknet_utils, "_cairo_versions", {})
+            account_probes.clear()
+            account = await starknet_utils.get_starknet_account("0x1234", "0x1")
+            assert account_probes == []
+            assert account.address == 0x1234
+            assert starknet_utils._cairo_versions == {
+                (constants.get_network_key(), 0x1234): 0
+            }
+
+        async def test_should_execute_with_the_cairo_version(
+            self, account_probes, monkeypatch
+        ):
+            account = _FakeAccount(0x1234)
+            monkeypatch.setitem(
+                starknet_utils._cairo_versions,
+                (constants.get_network_key(), 0x1234),
+                1,
+            )
+            await starknet_utils._execute(account, [], 0)
+            assert account.cairo_versions == [1]
+
+        async def test_should_persist_accounts_by_network(
+            self, account_probes, monkeypatch
+        ):
+            await starknet_utils.get_starknet_account("0x1234", "0x1")
+            monkeypatch.setattr(starknet_utils, "_accounts", {})
+            account_probes.clear()
+            # same chain id, another node
+            monkeypatch.setitem(constants.NETWORK, "name", "testnet")
+            monkeypatch.setitem(constants.NETWORK, "rpc_url", "https://goerli/rpc")
+            await starknet_utils.get_starknet_account("0x1234", "0x1")
+            assert "get_public_key" in account_probes
+
+        async def test_should_check_the_private_key(self, account_probes):
+            with pytest.raises(ValueError, match="not consistent"):
+                await starknet_utils.get_starknet_account("0x1234", "0x2")
+
+    class TestGetContractInstance:
+        @pytest.fixture
+        def artifact(self, tmp_path, monkeypatch):
+            monkeypatch.setattr(starknet_utils, "_abis", {})
+            monkeypatch.setattr(starknet_utils, "_contracts", {})
+            artifact = tmp_path / "Multicall.json"
+            artifact.write_text((constants.BUILD_DIR / "Multicall.json").read_text())
+            return artifact
+
+        @staticmethod
+        def _account(private_key):
+            from starknet_py.net.account.account import Account
+            from starknet_py.net.full_node_client import FullNodeClient
+            from starknet_py.net.models import StarknetChainId
+            from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+            return Account(
+                address=0x1234,
+                client=FullNodeClient("http://127.0.0.1:5050/rpc"),
+                chain=StarknetChainId.TESTNET,
+                key_pair=KeyPair.from_private_key(private_key),
+            )
+
+        def test_should_reload_abi_on_change(self, artifact):
+            abi = starknet_utils.get_abi(artifact)
+            assert starknet_utils.get_abi(artifact) is abi
+            artifact.write_text(json.dumps({"abi": abi[:1]}))
+            mtime = artifact.stat().st_mtime_ns + 1_000_000_000
+            os.utime(artifact, ns=(mtime, mtime))
+            assert starknet_utils.get_abi(artifact) == abi[:1]
+
+        def test_should_memoize_contracts(self, artifact):
+            account = self._account(1)
+            contract = starknet_utils.get_contract_instance(artifact, 0x99, account)
+            assert (
+                starknet_utils.get_contract_instance(artifact, 0x99, account)
+                is contract
+            )
+            assert "aggregate" in contract.functions
+            assert (
+                starknet_utils.get_contract_instance(artifact, 0x98, account)
+                is not contract
+            )
+
+        def test_should_rebuild_contracts_on_account_change(self, artifact):
+            contract = starknet_utils.get_contract_instance(
+                artifact, 0x99, self._account(1)
+            )
+            other = self._account(2)
+            rebuilt = starknet_utils.get_contract_instance(artifact, 0x99, other)
+            assert rebuilt is not contract
+            assert rebuilt.account is other
+
+        def test_should_rebuild_contracts_on_abi_change(self, artifact):
+            account = self._account(1)
+            contract = starknet_utils.get_contract_instance(artifact, 0x99, account)
+            mtime = artifact.stat().st_mtime_ns + 1_000_000_000
+            os.utime(artifact, ns=(mtime, mtime))
+            assert (
+                starknet_utils.get_contract_instance(artifact, 0x99, account)
+                is not contract
+            )
+
+    class TestNonceManager:
+        @staticmethod
+        def _send(account):
+            return starknet_utils._with_nonce(
+                account, lambda nonce: account.execute([], max_fee=0, nonce=nonce)
+            )
+
+        async def test_should_hand_out_sequential_nonces(self):
+            account = _FakeAccount(0x15)
+            await asyncio.gather(*[self._send(account) for _ in range(5)])
+            assert sorted(nonce for nonce, _ in account.executed) == list(range(5))
+            assert account.nonce_calls == 1
+
+        async def test_should_resync_after_send_failure(self):
+            account = _FakeAccount(0x151, fail_on=[1])
+            await self._send(account)
+            with pytest.raises(ValueError):
+                await self._send(account)
+            await self._send(account)
+            assert [nonce for nonce, _ in account.executed] == [0, 1]
+            assert account.nonce_calls == 2
+
+        async def test_should_resync_after_rejected_receipt(self, monkeypatch):
+            from starknet_py.net.client_models import TransactionStatus
+
+            async def wait_for_transaction(transaction_hash):
+                return TransactionStatus.REJECTED
+
+            monkeypatch.setattr(
+                starknet_utils, "wait_for_transaction", wait_for_transaction
+            )
+            account = _FakeAccount(0x152)
+            await self._send(account)
+            await self._send(account)
+            # the second transaction is rejected on chain
+            account.executed.pop()
+            await starknet_utils.wait_for_transactions([0x101], account)
+            await self._send(account)
+            assert [nonce for nonce, _ in account.executed] == [0, 1]
+            assert account.nonce_calls == 2
+
+    class TestCallMany:
+        @staticmethod
+        def _calls(count):
+            return [
+                Call(to_addr=i + 1, selector=0, calldata=[i] * (i % 3))
+                for i in range(count)
+            ]
+
+        @staticmethod
+        def _results(count):
+            return [[i + 1, *[i] * (i % 3)] for i in range(count)]
+
+        async def test_should_decode_aggregate_results(self):
+            client = _FakeClient()
+            results = await starknet_utils._aggregate(0x99, self._calls(5), client)
+            assert results == self._results(5)
+            assert client.requests == 1
+
+        async def test_should_split_on_limit_errors(self):
+            client = _FakeClient(max_calls=2, error=ValueError("Response too large"))
+            results = await starknet_utils._aggregate_or_split(
+                0x99, self._calls(8), client
+            )
+            assert results == self._results(8)
+            # 8 -> 2 x 4 -> 4 x 2
+            assert client.requests == 7
+
+        async def test_should_raise_reverts_at_once(self):
+            client = _FakeClient(
+                max_calls=0, error=ValueError("Execution was reverted")
+            )
+            with pytest.raises(ValueError, match="reverted"):
+                await starknet_utils._aggregate_or_split(0x99, self._calls(8), client)
+            assert client.requests == 1
+
+        async def test_should_not_split_reverts_mentioning_limits(self):
+            client = _FakeClient(
+                max_calls=0,
+                error=ClientError(
+                    "Contract error: Error at pc=0:413: max per wallet limit exceeded, "
+                    "selector 0x413ab, payload 0x1"
+                ),
+            )
+            with pytest.raises(ClientError, match="max per wallet"):
+                await starknet_utils._aggregate_or_split(0x99, self._calls(8), client)
+            assert client.requests == 1
+
+        @pytest.mark.parametrize(
+            "error, limit",
+            [
+                (asyncio.TimeoutError(), True),
+                (ClientError("<html>413 Request Entity Too Large</html>", "413"), True),
+                (ClientError("Payload Too Large", -32600), True),
+                (ClientError("RunResources has no remaining steps.", 40), True),
+                (ClientError("max fee exceeded", 40), False),
+                (ClientError("Contract error: 0x4130 limit reached", 40), False),
+                (ClientError("Internal Server Error", "500"), False),
+            ],
+        )
+        def test_should_tell_limit_errors(self, error, limit):
+            assert starknet_utils._is_limit_error(error) == limit
+
+        @pytest.mark.parametrize(
+            "deployments, requests",
+            [({}, 5), ({"Multicall": {"address": "0x99"}}, 3)],
+        )
+        async def test_should_call_many(self, monkeypatch, deployments, requests):
+            client = _FakeClient()
+
+            async def get_starknet_account():
+                return type("Account", (), {"client": client})()
+
+            monkeypatch.setattr(
+                starknet_utils, "get_starknet_account", get_starknet_account
+            )
+            monkeypatch.setattr(starknet_utils._deployments, "get", lambda: deployments)
+            results = await starknet_utils.call_many(
+                [(i + 1, "f", [i] * (i % 3)) for i in range(5)], max_calls=2
+            )
+            assert results == self._results(5)
+            assert client.requests == requests
+
+        def test_should_deserialize_named_results(self):
+            from starknet_py.abi import AbiParser
+            from starknet_py.serialization import serializer_for_function
+
+            abi = AbiParser(
+                [
+                    {
+                        "name": "getMaxPerWallet",
+                        "type": "function",
+                        "inputs": [],
+                        "outputs": [{"name": "max", "type": "felt"}],
+                        "stateMutability": "view",
+                    }
+                ]
+            ).parse()
+            serializer = serializer_for_function(abi.functions["getMaxPerWallet"])
+            assert starknet_utils._deserialize(serializer, [10]).max == 10
+            assert starknet_utils._deserialize(None, [10]) == [10]
@@ -1,3 +1,6 @@
+import asyncio
+import functools
+import hashlib
 import json
 import logging
 import os
@@ -5,11 +8,7 @@ from enum import IntEnum
 from math import ceil, log
 from pathlib import Path
 
-import requests
 from dotenv import load_dotenv
-from starknet_py.net.full_node_client import FullNodeClient
-from starknet_py.net.gateway_client import GatewayClient
-from starknet_py.net.models.chains import StarknetChainId
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -24,7 +23,7 @@ NETWORKS = {
         "rpc_url": f"https://starknet-mainnet.infura.io/v3/{os.getenv('INFURA_KEY')}",
         "gateway": "mainnet",
         "devnet": False,
-        "chain_id": StarknetChainId.MAINNET,
+        "chain_id": int.from_bytes(b"SN_MAIN", "big"),
     },
     "testnet": {
         "name": "testnet",
@@ -32,7 +31,7 @@ NETWORKS = {
         "rpc_url": f"https://starknet-goerli.infura.io/v3/{os.getenv('INFURA_KEY')}",
         "gateway": "testnet",
         "devnet": False,
-        "chain_id": StarknetChainId.TESTNET,
+        "chain_id": int.from_bytes(b"SN_GOERLI", "big"),
     },
     "testnet2": {
         "name": "testnet2",
@@ -40,7 +39,7 @@ NETWORKS = {
         "rpc_url": f"https://starknet-goerli2.infura.io/v3/{os.getenv('INFURA_KEY')}",
         "gateway": "testnet2",
         "devnet": False,
-        "chain_id": StarknetChainId.TESTNET2,
+        "chain_id": int.from_bytes(b"SN_GOERLI2", "big"),
     },
     "starknet-devnet": {
         "name": "starknet-devnet",
@@ -104,44 +103,38 @@ NETWORK["private_key"] = os.environ.get(f"{prefix}_PRIVATE_KEY")
 if NETWORK["private_key"] is None:
     logger.warning(f"⚠️  {prefix}_PRIVATE_KEY not set, defaulting to PRIVATE_KEY")
     NETWORK["private_key"] = os.getenv("PRIVATE_KEY")
-
-RPC_CLIENT = FullNodeClient(node_url=NETWORK["rpc_url"])
-GATEWAY_CLIENT = GatewayClient(NETWORK["gateway"]) if NETWORK.get("gateway") else None
-CLIENT = GATEWAY_CLIENT if GATEWAY_CLIENT is not None else RPC_CLIENT
-
-try:
-    response = requests.post(
-        RPC_CLIENT.url,
-        json={
-            "jsonrpc": "2.0",
-            "method": "starknet_chainId",
-            "params": [],
-            "id": 0,
-        },
-        timeout=5,
+# A network may list several RPC endpoints in "rpc_urls", extended with the comma separated
+# {prefix}_RPC_URLS env variable, RPC_URLS for the default network given by RPC_URL; "rpc_url"
+# is the first one, see utils.rpc_pool. Named networks never use RPC_URLS, which may point to
+# another chain.
+NETWORK["rpc_urls"] = list(
+    dict.fromkeys(
+        url
+        for url in [
+            *NETWORK.get("rpc_urls", [NETWORK["rpc_url"]]),
+            *os.getenv(f"{prefix}_RPC_URLS" if prefix else "RPC_URLS", "").split(","),
+        ]
+        if url
     )
-    payload = json.loads(response.text)
-
-    class ChainId(IntEnum):
-        chain_id = int(payload["result"], 16)
-
-    NETWORK["chain_id"] = ChainId.chain_id
-except (requests.exceptions.ConnectionError, requests.exceptions.MissingSchema):
-    pass
-
+)
+NETWORK["rpc_url"] = next(iter(NETWORK["rpc_urls"]), None)
 
 ETH_TOKEN_ADDRESS = 0x49D36570D4E46F48E99674BD3FCC84644DDD6B96F7C741B1562B82F9E004DC7
 SOURCE_DIR = Path("src")
 SOURCE_DIR_FIXTURES = Path("tests/fixtures")
-CONTRACTS = {p.stem: p for p in list(SOURCE_DIR.glob("**/*.cairo"))}
-CONTRACTS_FIXTURES = {p.stem: p for p in list(SOURCE_DIR_FIXTURES.glob("**/*.cairo"))}
 
 BUILD_DIR = Path("build")
 BUILD_DIR_FIXTURES = BUILD_DIR / "fixtures"
-BUILD_DIR.mkdir(exist_ok=True, parents=True)
-BUILD_DIR_FIXTURES.mkdir(exist_ok=True, parents=True)
 DEPLOYMENTS_DIR = Path("deployments") / NETWORK["name"]
-DEPLOYMENTS_DIR.mkdir(exist_ok=True, parents=True)
+MERKLE_CACHE_DIR = Path(".merkle_cache")
+CACHE_DIR = Path(".cache")
+# Opt-in persistence of the resolved accounts across runs, see get_starknet_account
+ACCOUNTS_CACHE = os.getenv("ACCOUNTS_CACHE", "false").lower() in ["1", "true"]
+# Immutable RPC results, e.g. classes by hash, are cached on disk unless disabled
+RPC_CACHE = os.getenv("RPC_CACHE", "true").lower() in ["1", "true"]
+# Budget of a single multicall transaction, see invoke_many
+MULTICALL_MAX_CALLS = int(os.getenv("MULTICALL_MAX_CALLS", 50))
+MULTICALL_MAX_CALLDATA = int(os.getenv("MULTICALL_MAX_CALLDATA", 3_000))
 
 COMPILED_CONTRACTS = [
     {"contract_name": "Sheet", "is_account_contract": False},
@@ -159,9 +152,157 @@ N_COLS = 15
 N_ROWS = 15
 
 ALLOW_LIST = []
+# When set, the allow list is streamed from this file (one address per line) instead
+ALLOW_LIST_FILE = os.getenv("ALLOW_LIST_FILE")
+
+
+@functools.lru_cache()
+def _get_clients():
+    from starknet_py.net.full_node_client import FullNodeClient
+    from starknet_py.net.gateway_client import GatewayClient
+    from utils.rpc_cache import RpcResultCache, cache_immutable_calls
+    from utils.rpc_pool import EndpointPool
+    from utils.sessions import LoopSession
+
+    # requests to the RPC are hedged and fail over across the endpoints of the network
+    rpc_session = (
+        EndpointPool(NETWORK["rpc_urls"])
+        if len(NETWORK["rpc_urls"]) > 1
+        else LoopSession()
+    )
+    rpc_client = FullNodeClient(node_url=NETWORK["rpc_url"], session=rpc_session)
+    # devnets share the chain id of testnet and are wiped on restart, nothing is immutable there
+    if RPC_CACHE and not NETWORK["devnet"]:
+        cache_immutable_calls(
+            rpc_client,
+            RpcResultCache(
+                CACHE_DIR / "rpc" / get_network_key(),
+                lambda: get_chain_id() and get_chain_id().value,
+            ),
+        )
+    gateway_client = (
+        GatewayClient(NETWORK["gateway"], session=LoopSession())
+        if NETWORK.get("gateway")
+        else None
+    )
+    return rpc_client, gateway_client, rpc_session
+
+
+@functools.lru_cache()
+def _get_contracts(source_dir):
+    return {p.stem: p for p in list(source_dir.glob("**/*.cairo"))}
+
+
+# Attributes resolved on first access only, so that importing this module stays cheap
+_LAZY_ATTRIBUTES = {
+    "RPC_CLIENT": lambda: _get_clients()[0],
+    "GATEWAY_CLIENT": lambda: _get_clients()[1],
+    "CLIENT": lambda: _get_clients()[1] or _get_clients()[0],
+    "RPC_SESSION": lambda: _get_clients()[2],
+    "CONTRACTS": lambda: _get_contracts(SOURCE_DIR),
+    "CONTRACTS_FIXTURES": lambda: _get_contracts(SOURCE_DIR_FIXTURES),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-if NETWORK.get("chain_id"):
+def _get_chain_ids_cache_file():
+    return CACHE_DIR / "chain_ids.json"
+
+
+def get_network_key():
+    """
+    Returns a key identifying NETWORK on disk: its name and a digest of its rpc url, since
+    several networks, e.g. devnet and testnet, share the same chain id.
+    """
+    # the rpc url may hold an api key, hence only its digest is used
+    digest = hashlib.sha256(str(NETWORK["rpc_url"]).encode()).hexdigest()
+    return f"{NETWORK['name'] or 'custom'}-{digest[:16]}"
+
+
+def _fetch_chain_id():
+    """
+    Returns the chain id of NETWORK["rpc_urls"], cached on disk by rpc url.
+    """
+    import requests
+    from utils.sessions import post
+
+    # the rpc url may hold an api key, hence only its digest is stored
+    key = hashlib.sha256(str(NETWORK["rpc_url"]).encode()).hexdigest()
+    try:
+        cached = json.loads(_get_chain_ids_cache_file().read_text())
+    except FileNotFoundError:
+        cached = {}
+    if key in cached:
+        return int(cached[key], 16)
+
+    # the first endpoint answering gives the chain id of the network
+    for rpc_url in NETWORK["rpc_urls"] or [NETWORK["rpc_url"]]:
+        try:
+            response = post(
+                rpc_url,
+                json={
+                    "jsonrpc": "2.0",
+                    "method": "starknet_chainId",
+                    "params": [],
+                    "id": 0,
+                },
+                timeout=5,
+            )
+            chain_id = int(json.loads(response.text)["result"], 16)
+            break
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.MissingSchema,
+        ):
+            continue
+    else:
+        return None
+    _get_chain_ids_cache_file().parent.mkdir(exist_ok=True, parents=True)
+    _get_chain_ids_cache_file().write_text(
+        json.dumps({**cached, key: hex(chain_id)}, indent=2)
+    )
+    return chain_id
+
+
+def get_chain_id():
+    """
+    Returns the chain id of NETWORK, fetched from its RPC on first use unless known beforehand.
+    """
+    if isinstance(NETWORK.get("chain_id"), IntEnum):
+        return NETWORK["chain_id"]
+    value = NETWORK.get("chain_id") or _fetch_chain_id()
+    if value is None:
+        return None
+
+    from starknet_py.net.models.chains import StarknetChainId
+
+    if value in set(StarknetChainId):
+        NETWORK["chain_id"] = StarknetChainId(value)
+    else:
+
+        class ChainId(IntEnum):
+            chain_id = value
+
+        NETWORK["chain_id"] = ChainId.chain_id
+
+    rpc_client, gateway_client, _ = _get_clients()
     logger.info(
         f"ℹ️  Connected to CHAIN_ID {NETWORK['chain_id'].value.to_bytes(ceil(log(NETWORK['chain_id'].value, 256)), 'big')} "
-        f"with {f'Gateway {GATEWAY_CLIENT.net}' if GATEWAY_CLIENT is not None else f'RPC {RPC_CLIENT.url}'}"
+        f"with {f'Gateway {gateway_client.net}' if gateway_client is not None else f'RPC {rpc_client.url}'}"
     )
+    return NETWORK["chain_id"]
+
+
+async def get_chain_id_async():
+    """
+    Same as get_chain_id, for coroutines: the RPC is queried in a thread on first use so that
+    the event loop is not blocked.
+    """
+    if isinstance(NETWORK.get("chain_id"), IntEnum):
+        return NETWORK["chain_id"]
+    return await asyncio.to_thread(get_chain_id)
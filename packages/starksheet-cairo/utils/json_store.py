@@ -0,0 +1,82 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from copy import deepcopy
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class JsonStore:
+    """
+    In-memory view of a json object file shared by concurrent scripts.
+
+    The file is loaded lazily and only read again when its mtime changes. Updates are written
+    through under an exclusive lock on a sibling .lock file: the file is re-read, the given
+    entries are merged in and the result is written to a temporary file renamed over the
+    original, so that readers never see a partial file and parallel jobs do not lose entries.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._data = None
+        self._mtime = None
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        mtime = self._stat()
+        if self._data is None or mtime != self._mtime:
+            self._data = {} if mtime is None else json.loads(self.path.read_text())
+            self._mtime = mtime
+        return self._data
+
+    def get(self):
+        """
+        Returns the content of the file, not to be mutated.
+        """
+        return self._load()
+
+    def copy(self):
+        return deepcopy(self._load())
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        with open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def update(self, entries, replace=False):
+        """
+        Merges the given entries into the file, or replaces its whole content with them when
+        replace is set, and returns the new content.
+        """
+        with self._locked():
+            data = dict(entries) if replace else {**self._load(), **entries}
+            fd, tmp = tempfile.mkstemp(
+                dir=self.path.parent, prefix=f".{self.path.name}."
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=2)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._data = data
+            self._mtime = self._stat()
+        return data
@@ -0,0 +1,285 @@
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import struct
+from bisect import bisect_left
+from heapq import merge
+from pathlib import Path
+
+from utils.merkle_proof import MerkleTree, hash2_many, leaves_many, level_lengths
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+MAGIC = b"SSMT"
+# 2: leafs sorted by address
+VERSION = 2
+# magic, version, capacity, size
+HEADER = struct.Struct(">4sIQQ")
+HEADER_SIZE = 32
+FELT_SIZE = 32
+
+
+def addresses_digest(addresses):
+    """
+    Returns the sha256 hex digest of the sorted set of the given addresses.
+    """
+    digest = hashlib.sha256()
+    for address in sorted(set(addresses)):
+        digest.update(address.to_bytes(FELT_SIZE, "big"))
+    return digest.hexdigest()
+
+
+def _capacity(size):
+    return 1 << max(size - 1, 0).bit_length()
+
+
+def _file_size(capacity):
+    # addresses region + 2 * capacity - 1 tree nodes
+    return HEADER_SIZE + FELT_SIZE * (3 * capacity - 1)
+
+
+def _is_current(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    return len(header) == HEADER.size and HEADER.unpack(header)[:2] == (MAGIC, VERSION)
+
+
+def _temporary(path):
+    # not matched by the *.tree glob of sync
+    return path.with_name(f"{path.name}.tmp")
+
+
+class MerkleTreeCache:
+    """
+    Merkle tree of an allow list persisted in a memory-mapped file.
+
+    The file holds a header, the addresses in leaf order and every level of the tree, all
+    as 32 bytes big endian felts. Regions are sized for a power of two capacity so that
+    the file only grows when the capacity is exceeded.
+
+    Leafs are kept sorted by address, hence the root of an updated cache is the one of
+    MerkleTree.from_addresses(sorted(addresses)), whatever the order of the updates. Adding
+    or removing addresses only rehashes the paths of the leafs after the first touched one.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self.capacity, self.size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a merkle tree cache")
+        self._indexes = None
+
+    @classmethod
+    def create(cls, path, addresses):
+        """
+        Builds the tree of the given addresses and writes it to path.
+        """
+        path = Path(path)
+        addresses = sorted(set(addresses))
+        tree = MerkleTree(leaves_many(addresses))
+        capacity = _capacity(len(addresses))
+        temporary = _temporary(path)
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, capacity, len(addresses)))
+            f.truncate(_file_size(capacity))
+            f.seek(HEADER_SIZE)
+            f.write(b"".join(a.to_bytes(FELT_SIZE, "big") for a in addresses))
+            offset = HEADER_SIZE + FELT_SIZE * capacity
+            for level, nodes in enumerate(tree.levels):
+                f.seek(offset)
+                f.write(b"".join(node.to_bytes(FELT_SIZE, "big") for node in nodes))
+                offset += FELT_SIZE * (capacity >> level)
+        os.replace(temporary, path)
+        return cls(path)
+
+    @classmethod
+    def sync(cls, directory, addresses):
+        """
+        Returns the cache of the given addresses, stored in directory under the digest of
+        the address set.
+
+        When no such cache exists, a copy of the most recent cache of the directory is updated
+        with the added and removed addresses and moved in place of the previous one, so that an
+        interrupted update leaves the previous cache untouched; the tree is built from scratch
+        only if the directory holds no cache of the current format.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        addresses = set(addresses)
+        path = directory / f"{addresses_digest(addresses)}.tree"
+        for outdated in [p for p in directory.glob("*.tree") if not _is_current(p)]:
+            logger.info(f"ℹ️  Dropping outdated merkle tree cache {outdated}")
+            outdated.unlink()
+        if path.is_file():
+            return cls(path)
+
+        previous = sorted(directory.glob("*.tree"), key=lambda p: p.stat().st_mtime)
+        if not previous:
+            logger.info(f"ℹ️  Building merkle tree cache {path}")
+            return cls.create(path, addresses)
+
+        temporary = _temporary(path)
+        shutil.copyfile(previous[-1], temporary)
+        try:
+            with cls(temporary) as cache:
+                cached = cache.indexes.keys()
+                added = sorted(addresses - cached)
+                removed = sorted(cached - addresses)
+                logger.info(
+                    f"ℹ️  Updating merkle tree cache {previous[-1]} "
+                    f"(+{len(added)}, -{len(removed)})"
+                )
+                cache.update(added=added, removed=removed)
+            os.replace(temporary, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        previous[-1].unlink()
+        return cls(path)
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _address_offset(self, index):
+        return HEADER_SIZE + FELT_SIZE * index
+
+    def _node_offset(self, level, index):
+        # levels are stored one after the other, level k having capacity >> k slots
+        start = self.capacity + 2 * self.capacity - 2 * (self.capacity >> level)
+        return HEADER_SIZE + FELT_SIZE * (start + index)
+
+    def _read(self, offset):
+        return int.from_bytes(self._map[offset : offset + FELT_SIZE], "big")
+
+    def _write(self, offset, value):
+        self._map[offset : offset + FELT_SIZE] = value.to_bytes(FELT_SIZE, "big")
+
+    def address(self, index):
+        return self._read(self._address_offset(index))
+
+    def node(self, level, index):
+        return self._read(self._node_offset(level, index))
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            self._indexes = {self.address(i): i for i in range(self.size)}
+        return self._indexes
+
+    @property
+    def root(self):
+        if self.size == 0:
+            return 0
+        return self.node(len(level_lengths(self.size)) - 1, 0)
+
+    def proof_at(self, index):
+        """
+        Returns the merkle proof of the leaf at the given index.
+        """
+        proof = []
+        for level, length in enumerate(level_lengths(self.size)[:-1]):
+            sibling = index ^ 1
+            proof.append(self.node(level, sibling if sibling < length else index))
+            index //= 2
+        return proof
+
+    def proof(self, address):
+        """
+        Returns the merkle proof for the given address belonging to the cached addresses.
+        """
+        if address not in self.indexes:
+            raise ValueError("Address not in addresses")
+        return self.proof_at(self.indexes[address])
+
+    def proofs(self):
+        return {
+            address: self.proof_at(index) for address, index in self.indexes.items()
+        }
+
+    def update(self, added=(), removed=()):
+        """
+        Adds and removes the given addresses, keeping the leafs sorted by address so that the
+        root only depends on the address set.
+
+        The leafs from the first touched one onwards are shifted, reusing their cached hashes,
+        and their paths rehashed. The file is modified in place: use sync to update a cache
+        that must survive an interruption.
+        """
+        indexes = self.indexes
+        added = sorted({address for address in added if address not in indexes})
+        removed = {address for address in removed if address in indexes}
+        if not added and not removed:
+            return
+
+        addresses = sorted(indexes, key=indexes.get)
+        first = min(
+            (indexes[address] for address in removed),
+            default=self.size,
+        )
+        if added:
+            first = min(first, bisect_left(addresses, added[0]))
+        kept = [
+            (address, self.node(0, index))
+            for index, address in enumerate(addresses[first:], start=first)
+            if address not in removed
+        ]
+        tail = list(merge(kept, zip(added, leaves_many(added))))
+        size = first + len(tail)
+
+        self._reserve(size)
+        for index, (address, leaf) in enumerate(tail, start=first):
+            self._write(self._address_offset(index), address)
+            self._write(self._node_offset(0, index), leaf)
+            indexes[address] = index
+        for address in removed:
+            del indexes[address]
+        self.size = size
+
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.size)
+        if self.size > 0:
+            self._rehash(range(min(first, self.size - 1), self.size))
+        self._map.flush()
+
+    def _rehash(self, dirty):
+        indexes = sorted(dirty)
+        for level, length in enumerate(level_lengths(self.size)[:-1]):
+            parents = sorted({index // 2 for index in indexes})
+            lefts = [self.node(level, 2 * parent) for parent in parents]
+            rights = [
+                self.node(level, 2 * parent + 1) if 2 * parent + 1 < length else left
+                for parent, left in zip(parents, lefts)
+            ]
+            for parent, digest in zip(parents, hash2_many(lefts, rights)):
+                self._write(self._node_offset(level + 1, parent), digest)
+            indexes = parents
+
+    def _reserve(self, size):
+        if size <= self.capacity:
+            return
+        capacity = _capacity(size)
+        addresses = self._map[self._address_offset(0) : self._address_offset(self.size)]
+        levels = [
+            self._map[self._node_offset(level, 0) : self._node_offset(level, length)]
+            for level, length in enumerate(level_lengths(self.size))
+        ]
+        self._map.close()
+        self._file.truncate(_file_size(capacity))
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.capacity = capacity
+        self._map[self._address_offset(0) : self._address_offset(self.size)] = addresses
+        for level, nodes in enumerate(levels):
+            offset = self._node_offset(level, 0)
+            self._map[offset : offset + len(nodes)] = nodes
@@ -1,8 +1,12 @@
 import logging
 import string
+from itertools import repeat
 
-from starkware.crypto.signature.signature import pedersen_hash
 from utils.constants import N_COLS
+from utils.pedersen import pedersen_hash, pedersen_hash_sorted_many
+from utils.proof_store import write_proof_store
+
+from utils import pedersen
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -18,52 +22,185 @@ def hash2(x, y):
     return pedersen_hash(x, y) if x <= y else pedersen_hash(y, x)
 
 
-def merkle_root(leafs):
-    if not leafs:
-        return 0
-    if len(leafs) == 1:
-        return leafs[0]
-    if len(leafs) % 2 == 1:
-        leafs.append(leafs[-1])
-    return merkle_root([hash2(x, y) for x, y in zip(leafs[::2], leafs[1::2])])
+def hash2_many(xs, ys):
+    return pedersen_hash_sorted_many(xs, ys)
 
 
 def address_to_leaf(address):
     return hash2(address, address)
 
 
+def leaves_many(addresses):
+    addresses = list(addresses)
+    return hash2_many(addresses, addresses)
+
+
+def level_lengths(size):
+    """
+    Returns the number of nodes of each level of a tree with size leafs, from leafs to root.
+    """
+    lengths = [size]
+    while lengths[-1] > 1:
+        lengths.append((lengths[-1] + 1) // 2)
+    return lengths
+
+
+class MerkleTree:
+    """
+    Merkle tree built once from its leafs.
+
+    Every level is hashed a single time and kept in memory so that any proof is
+    then read from the stored levels instead of rebuilding the tree. When a level
+    has an odd length, its last node is paired with itself.
+    """
+
+    def __init__(self, leafs, addresses=None):
+        self.levels = [list(leafs)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            if len(level) % 2 == 1:
+                level = level + [level[-1]]
+            self.levels.append(hash2_many(level[::2], level[1::2]))
+        self._index(addresses)
+
+    def _index(self, addresses):
+        self.addresses = list(addresses) if addresses is not None else []
+        self.indexes = {}
+        for index, address in enumerate(self.addresses):
+            self.indexes.setdefault(address, index)
+
+    @classmethod
+    def from_addresses(cls, addresses):
+        addresses = list(addresses)
+        return cls.sharded(leaves_many(addresses), addresses)
+
+    @classmethod
+    def sharded(cls, leafs, addresses=None, shard_size=None):
+        """
+        Builds the tree by splitting the leafs into power of two shards, each subtree being
+        hashed in a worker process, then hashing the shard roots together.
+
+        Shards are aligned on the tree levels, hence the levels, root and proofs are exactly
+        the ones of the sequential build. By default, there is one shard per worker and the
+        tree is built sequentially when there is a single worker or a single shard.
+        """
+        leafs = list(leafs)
+        if shard_size is None:
+            shard_size = -(-len(leafs) // pedersen.MAX_WORKERS)
+        # round up to a power of two so that shards are aligned on the tree levels
+        shard_size = 1 << max(shard_size - 1, 0).bit_length()
+        if (
+            pedersen.MAX_WORKERS <= 1
+            or len(leafs) < pedersen.MIN_PARALLEL_BATCH
+            or len(leafs) <= shard_size
+        ):
+            return cls(leafs, addresses)
+
+        height = shard_size.bit_length() - 1
+        shards = list(
+            pedersen.get_executor().map(
+                _shard_levels,
+                [leafs[i : i + shard_size] for i in range(0, len(leafs), shard_size)],
+                repeat(height),
+            )
+        )
+        top = cls([levels[-1][0] for levels in shards])
+        tree = cls.__new__(cls)
+        tree.levels = [
+            [node for levels in shards for node in levels[level]]
+            for level in range(height)
+        ] + top.levels
+        tree._index(addresses)
+        return tree
+
+    @property
+    def root(self):
+        return self.levels[-1][0] if self.levels[0] else 0
+
+    def proof_at(self, index):
+        """
+        Returns the merkle proof of the leaf at the given index.
+        """
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            proof.append(level[sibling] if sibling < len(level) else level[index])
+            index //= 2
+        return proof
+
+    def proof(self, address):
+        """
+        Returns the merkle proof for the given address belonging to the tree's addresses.
+        """
+        if address not in self.indexes:
+            raise ValueError("Address not in addresses")
+        return self.proof_at(self.indexes[address])
+
+    def proofs(self):
+        return {
+            address: self.proof_at(index) for address, index in self.indexes.items()
+        }
+
+    def dump_proofs(self, path):
+        """
+        Exports the proofs of all the addresses to a binary proof store, see utils.proof_store.
+        """
+        write_proof_store(path, self.proofs().items(), self.root)
+
+
+def _shard_levels(leafs, height):
+    """
+    Returns the levels of the subtree of the given leafs, up to the given height.
+
+    Only the last shard can be smaller than 2**height: its root is then the last node of the
+    upper levels of the whole tree and is hashed with itself up to the shard height.
+    """
+    levels = MerkleTree(leafs).levels
+    while len(levels) <= height:
+        levels.append(hash2_many(levels[-1], levels[-1]))
+    return levels
+
+
+def merkle_root(leafs):
+    return MerkleTree.sharded(leafs).root
+
+
 def merkle_proof(address, addresses):
     """
     Returns the merkle proof for the given address belonging to the given list of addresses.
     """
-    if address not in addresses:
-        raise ValueError("Address not in addresses")
-    leafs = [address_to_leaf(address) for address in addresses]
-    if len(leafs) % 2 == 1:
-        leafs.append(leafs[-1])
-    index = addresses.index(address)
-    proof = [leafs[(index + 1) if (index % 2 == 0) else (index - 1)]]
-
-    while len(leafs) > 1:
-        leafs = [hash2(x, y) for x, y in zip(leafs[::2], leafs[1::2])]
-        if len(leafs) == 1:
-            break
-        if len(leafs) % 2 == 1:
-            leafs.append(leafs[-1])
-        index = index // 2
-        proof.append(leafs[(index + 1) if (index % 2 == 0) else (index - 1)])
-
-    return proof
+    return MerkleTree.from_addresses(addresses).proof(address)
 
 
 def merkle_proofs(addresses):
-    return {address: merkle_proof(address, addresses) for address in addresses}
+    return MerkleTree.from_addresses(addresses).proofs()
 
 
 def merkle_verify(leaf, root, proof):
     """
     Verifies the given merkle proof for the given address.
     """
-    if len(proof) == 0:
-        return leaf == root
-    return merkle_verify(hash2(proof[0], leaf), root, proof[1:])
+    node = leaf
+    for sibling in proof:
+        node = hash2(sibling, node)
+    return node == root
+
+
+def merkle_verify_many(leafs, root, proofs):
+    """
+    Verifies the given merkle proofs for the given leafs, in the same order.
+
+    Proofs of the same tree share their upper nodes, so each hashed pair is memoized: checking
+    all the proofs of a tree costs about one hash per node instead of one per leaf and level.
+    """
+    nodes = {}
+    results = []
+    for leaf, proof in zip(leafs, proofs):
+        node = leaf
+        for sibling in proof:
+            pair = (node, sibling) if node <= sibling else (sibling, node)
+            if pair not in nodes:
+                nodes[pair] = hash2(*pair)
+            node = nodes[pair]
+        results.append(node == root)
+    return results
@@ -0,0 +1,197 @@
+import json
+import logging
+import tempfile
+from heapq import merge
+from itertools import islice
+from pathlib import Path
+
+from utils.merkle_proof import hash2, leaves_many, level_lengths
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+FELT_SIZE = 32
+# Number of addresses hashed at once through the batched Pedersen backend
+CHUNK_SIZE = 2**12
+# Number of addresses sorted in memory before being spilled to a temporary file
+SORT_CHUNK_SIZE = 2**20
+
+
+def read_addresses(path):
+    """
+    Yields the addresses of a text file holding one hex or decimal address per line.
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield int(line, 16) if line.startswith("0x") else int(line)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while data := f.read(FELT_SIZE):
+            yield int.from_bytes(data, "big")
+
+
+def sorted_addresses(addresses, tmp_dir=None, chunk_size=SORT_CHUNK_SIZE):
+    """
+    Yields the distinct given addresses in increasing order, which is the leaf order of the
+    merkle tree cache.
+
+    Chunks of addresses are sorted in memory and spilled to temporary files, then merged, so
+    that memory stays O(chunk_size) plus one buffered reader per chunk.
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        runs = []
+        for chunk in _chunks(addresses, chunk_size):
+            runs.append(Path(tmp) / f"run_{len(runs)}.bin")
+            with open(runs[-1], "wb") as f:
+                f.write(
+                    b"".join(a.to_bytes(FELT_SIZE, "big") for a in sorted(set(chunk)))
+                )
+        previous = None
+        for address in merge(*map(_read_run, runs)):
+            if address != previous:
+                yield address
+                previous = address
+
+
+class MerkleStreamBuilder:
+    """
+    Computes a merkle root from leafs pushed one at a time.
+
+    Only the left node waiting for its sibling is kept at each level, hence O(log n) memory.
+    The optional on_node(level, node) callback receives every node of the tree, each level
+    in index order.
+    """
+
+    def __init__(self, on_node=None):
+        self.size = 0
+        self.pending = []
+        self.on_node = on_node
+
+    def _emit(self, level, node):
+        if self.on_node is not None:
+            self.on_node(level, node)
+
+    def push(self, leaf):
+        self.size += 1
+        self._emit(0, leaf)
+        level, node = 0, leaf
+        while level < len(self.pending) and self.pending[level] is not None:
+            node = hash2(self.pending[level], node)
+            self.pending[level] = None
+            level += 1
+            self._emit(level, node)
+        if level == len(self.pending):
+            self.pending.append(node)
+        else:
+            self.pending[level] = node
+
+    def finish(self):
+        """
+        Hashes the last node of every odd level with itself and returns the root.
+        """
+        if self.size == 0:
+            return 0
+        height = len(level_lengths(self.size)) - 1
+        carry = None
+        for level in range(height):
+            left = self.pending[level] if level < len(self.pending) else None
+            if left is None and carry is None:
+                continue
+            if left is None:
+                left = carry
+            carry = hash2(left, carry if carry is not None else left)
+            self._emit(level + 1, carry)
+        return carry if carry is not None else self.pending[height]
+
+
+class _SiblingReader:
+    """
+    Reads the nodes of a level file pair by pair, for increasing node indexes.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.pair = -1
+        self.left = self.right = None
+
+    def sibling(self, index):
+        while self.pair < index // 2:
+            data = self.file.read(2 * FELT_SIZE)
+            self.left = int.from_bytes(data[:FELT_SIZE], "big")
+            # odd level: the last node is its own sibling
+            self.right = int.from_bytes(data[FELT_SIZE:] or data, "big")
+            self.pair += 1
+        return self.right if index % 2 == 0 else self.left
+
+    def close(self):
+        self.file.close()
+
+
+def stream_merkle_root(addresses):
+    """
+    Returns the merkle root of the given addresses, consumed as a stream.
+    """
+    builder = MerkleStreamBuilder()
+    for chunk in _chunks(addresses, CHUNK_SIZE):
+        for leaf in leaves_many(chunk):
+            builder.push(leaf)
+    return builder.finish()
+
+
+def write_proofs_jsonl(addresses, output, tmp_dir=None):
+    """
+    Writes to output one {"address", "proof"} json object per line and returns the merkle root.
+
+    The addresses are consumed as a stream and the tree levels are spilled to temporary files,
+    then read back sequentially, so that memory stays O(log n) whatever the number of addresses.
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        tmp = Path(tmp)
+        levels = {}
+
+        def on_node(level, node):
+            if level not in levels:
+                levels[level] = open(tmp / f"level_{level}.bin", "wb")
+            levels[level].write(node.to_bytes(FELT_SIZE, "big"))
+
+        builder = MerkleStreamBuilder(on_node)
+        with open(tmp / "addresses.bin", "wb") as f:
+            for chunk in _chunks(addresses, CHUNK_SIZE):
+                for address, leaf in zip(chunk, leaves_many(chunk)):
+                    f.write(address.to_bytes(FELT_SIZE, "big"))
+                    builder.push(leaf)
+        root = builder.finish()
+        for level in levels.values():
+            level.close()
+        logger.info(f"ℹ️  Merkle root of {builder.size} addresses: {root}")
+
+        readers = [
+            _SiblingReader(tmp / f"level_{level}.bin")
+            for level in range(len(level_lengths(builder.size)) - 1)
+        ]
+        with open(tmp / "addresses.bin", "rb") as f, open(output, "w") as out:
+            for index in range(builder.size):
+                address = int.from_bytes(f.read(FELT_SIZE), "big")
+                proof = [
+                    reader.sibling(index >> level)
+                    for level, reader in enumerate(readers)
+                ]
+                out.write(
+                    json.dumps(
+                        {"address": hex(address), "proof": [str(p) for p in proof]}
+                    )
+                    + "\n"
+                )
+        for reader in readers:
+            reader.close()
+    return root
@@ -0,0 +1,110 @@
+import atexit
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_pedersen_hash = None
+
+
+def _get_backend():
+    """
+    Picks the fastest Pedersen implementation available on first use: the C++ binding shipped
+    with starknet_py, then the fastecdsa based one of cairo-lang, then pure python. Loading
+    them takes a while, hence not at import time.
+    """
+    global _pedersen_hash, PEDERSEN_BACKEND
+    if _pedersen_hash is not None:
+        return _pedersen_hash
+    try:
+        from crypto_cpp_py.cpp_bindings import cpp_hash
+
+        _pedersen_hash, PEDERSEN_BACKEND = cpp_hash, "crypto-cpp"
+    except ImportError:
+        try:
+            from starkware.crypto.signature.fast_pedersen_hash import pedersen_hash
+
+            _pedersen_hash, PEDERSEN_BACKEND = pedersen_hash, "fast-pedersen"
+        except ImportError:
+            from starkware.crypto.signature.signature import pedersen_hash
+
+            _pedersen_hash, PEDERSEN_BACKEND = pedersen_hash, "python"
+    return _pedersen_hash
+
+
+def __getattr__(name):
+    if name == "PEDERSEN_BACKEND":
+        _get_backend()
+        return PEDERSEN_BACKEND
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def pedersen_hash(x, y):
+    return (_pedersen_hash or _get_backend())(x, y)
+
+
+# Below this number of pairs, the cost of shipping the batch to worker processes
+# outweighs the hashing itself.
+MIN_PARALLEL_BATCH = int(os.getenv("PEDERSEN_MIN_PARALLEL_BATCH", 2**14))
+MAX_WORKERS = int(os.getenv("PEDERSEN_MAX_WORKERS", os.cpu_count() or 1))
+
+_executor = None
+
+
+def _init_worker():
+    # workers hash their own batches sequentially instead of starting nested pools
+    global MAX_WORKERS
+    MAX_WORKERS = 1
+
+
+def get_executor():
+    """
+    Returns the process pool shared by all the batched hashing of this process.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS, initializer=_init_worker
+        )
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def shutdown_executor():
+    """
+    Stops the worker processes of the pool, which is started again by the next batch.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def _hash_sorted_pairs(xs, ys):
+    hash_ = _get_backend()
+    return [hash_(x, y) if x <= y else hash_(y, x) for x, y in zip(xs, ys)]
+
+
+def pedersen_hash_sorted_many(xs, ys):
+    """
+    Hashes each (x, y) pair with the smallest value first, as the cairo merkle_tree does.
+
+    Large batches are split into one chunk per worker and hashed in a process pool.
+    """
+    xs = list(xs)
+    ys = list(ys)
+    if len(xs) != len(ys):
+        raise ValueError(f"Cannot hash pairs of {len(xs)} and {len(ys)} values")
+    if MAX_WORKERS <= 1 or len(xs) < MIN_PARALLEL_BATCH:
+        return _hash_sorted_pairs(xs, ys)
+
+    chunk_size = -(-len(xs) // MAX_WORKERS)
+    chunks = range(0, len(xs), chunk_size)
+    results = get_executor().map(
+        _hash_sorted_pairs,
+        [xs[i : i + chunk_size] for i in chunks],
+        [ys[i : i + chunk_size] for i in chunks],
+    )
+    return [digest for chunk in results for digest in chunk]
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+MAGIC = b"SSPS"
+VERSION = 1
+# magic, version, height, size, buckets count, root
+HEADER = struct.Struct(">4sIIQQ32s")
+FELT_SIZE = 32
+BUCKET = struct.Struct(">Q")
+
+
+def _bucket_hash(address):
+    digest = hashlib.sha256(address.to_bytes(FELT_SIZE, "big")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def write_proof_store(path, proofs, root):
+    """
+    Writes the given (address, proof) pairs to a binary proof store.
+
+    The file holds a header, one fixed width record per address (the address followed by its
+    proof, all as 32 bytes big endian felts) and an open addressing table mapping the sha256
+    of each address to its record, so that a single proof can be read without parsing the
+    rest of the file. All the proofs of a merkle tree have the same length.
+    """
+    height = None
+    hashes = array("Q")
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        for address, proof in proofs:
+            if height is None:
+                height = len(proof)
+            elif len(proof) != height:
+                raise ValueError(
+                    f"Proof of {hex(address)} has length {len(proof)}, expected {height}"
+                )
+            f.write(address.to_bytes(FELT_SIZE, "big"))
+            f.write(b"".join(node.to_bytes(FELT_SIZE, "big") for node in proof))
+            hashes.append(_bucket_hash(address))
+
+        # load factor <= 0.5, stored index is record index + 1, 0 meaning empty
+        buckets_count = 1 << (2 * len(hashes)).bit_length()
+        buckets = array("Q", bytes(8 * buckets_count))
+        for record, bucket_hash in enumerate(hashes):
+            bucket = bucket_hash & (buckets_count - 1)
+            while buckets[bucket] != 0:
+                bucket = (bucket + 1) & (buckets_count - 1)
+            buckets[bucket] = record + 1
+        if sys.byteorder == "little":
+            buckets.byteswap()
+        f.write(buckets.tobytes())
+
+        f.seek(0)
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                height or 0,
+                len(hashes),
+                buckets_count,
+                root.to_bytes(FELT_SIZE, "big"),
+            )
+        )
+
+
+class ProofStore:
+    """
+    Memory-mapped reader of a binary proof store, see write_proof_store.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.height,
+            self.size,
+            self.buckets_count,
+            root,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a proof store")
+        self.root = int.from_bytes(root, "big")
+        self._record_size = FELT_SIZE * (1 + self.height)
+        self._buckets_offset = HEADER.size + self.size * self._record_size
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, address):
+        return self._find(address) is not None
+
+    def _find(self, address):
+        bucket = _bucket_hash(address) & (self.buckets_count - 1)
+        while True:
+            (record,) = BUCKET.unpack_from(
+                self._map, self._buckets_offset + BUCKET.size * bucket
+            )
+            if record == 0:
+                return None
+            offset = HEADER.size + (record - 1) * self._record_size
+            if int.from_bytes(self._map[offset : offset + FELT_SIZE], "big") == address:
+                return offset
+            bucket = (bucket + 1) & (self.buckets_count - 1)
+
+    def proof(self, address):
+        """
+        Returns the merkle proof of the given address.
+        """
+        offset = self._find(address)
+        if offset is None:
+            raise ValueError("Address not in addresses")
+        return [
+            int.from_bytes(
+                self._map[offset + FELT_SIZE * i : offset + FELT_SIZE * (i + 1)], "big"
+            )
+            for i in range(1, self.height + 1)
+        ]
@@ -0,0 +1,54 @@
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class BlockReadCache:
+    """
+    In-memory cache of raw view call results, keyed by address, selector, calldata and block
+    number.
+
+    The cache tracks the latest block observed: entries of older blocks are dropped as soon as
+    a newer one is observed, so that it only ever holds the results of the current snapshot.
+    """
+
+    def __init__(self):
+        self.block_number = None
+        self._results = {}
+
+    @staticmethod
+    def _key(call, block_number):
+        return (call.to_addr, call.selector, tuple(call.calldata), block_number)
+
+    def observe(self, block_number):
+        """
+        Records a block seen on chain, dropping the entries of the previous blocks when newer.
+        """
+        if self.block_number is not None and block_number <= self.block_number:
+            return
+        if self._results:
+            logger.info(
+                f"ℹ️  New block {block_number}, dropping {len(self._results)} cached reads"
+            )
+        self._results = {
+            key: result
+            for key, result in self._results.items()
+            if key[-1] >= block_number
+        }
+        self.block_number = block_number
+
+    def get(self, call, block_number):
+        """
+        Returns the cached result of the call at block_number, None when missing.
+        """
+        return self._results.get(self._key(call, block_number))
+
+    def put(self, call, block_number, result):
+        # results of blocks already superseded would never be read again
+        if self.block_number is not None and block_number < self.block_number:
+            return
+        self._results[self._key(call, block_number)] = list(result)
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_bypass = contextvars.ContextVar("rpc_cache_bypass", default=False)
+
+FINALIZED_STATUSES = ["ACCEPTED_ON_L1", "REJECTED"]
+
+
+def _is_finalized_receipt(result):
+    return (
+        result.get("finality_status") == "ACCEPTED_ON_L1"
+        or result.get("status") in FINALIZED_STATUSES
+    )
+
+
+# JSON-RPC methods whose result never changes once returned, with the params identifying the
+# result and whether a given result is final
+IMMUTABLE_METHODS = {
+    # a class is identified by its hash whatever the block it is read at
+    "getClass": (["class_hash"], lambda result: True),
+    "getTransactionReceipt": (["transaction_hash"], _is_finalized_receipt),
+}
+
+
+class RpcResultCache:
+    """
+    Content-addressed disk cache of immutable JSON-RPC results.
+
+    Each result is stored in its own file, named after the sha256 of the method and of the params
+    identifying it, under a directory per chain id so that networks sharing hashes never mix.
+    """
+
+    def __init__(self, directory, chain_id):
+        self.directory = Path(directory)
+        # the chain id is only resolved on the first lookup
+        self._get_chain_id = chain_id
+        self._chain_id = None
+
+    def chain_id(self):
+        if self._chain_id is None:
+            self._chain_id = self._get_chain_id()
+        return self._chain_id
+
+    async def resolve_chain_id(self):
+        """
+        Resolves the chain id in a thread, since it may be fetched with a blocking request.
+        """
+        if self._chain_id is None:
+            self._chain_id = await asyncio.to_thread(self._get_chain_id)
+        return self._chain_id
+
+    def _path(self, method_name, params):
+        keys, _ = IMMUTABLE_METHODS[method_name]
+        content = json.dumps(
+            [method_name, [str(params[key]) for key in keys]], separators=(",", ":")
+        )
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        return (
+            self.directory
+            / hex(self.chain_id())
+            / method_name
+            / digest[:2]
+            / f"{digest}.json"
+        )
+
+    def is_cacheable(self, method_name, params):
+        return (
+            method_name in IMMUTABLE_METHODS
+            and isinstance(params, dict)
+            and all(key in params for key in IMMUTABLE_METHODS[method_name][0])
+            and self.chain_id() is not None
+        )
+
+    def get(self, method_name, params):
+        """
+        Returns the cached result, None when missing.
+        """
+        try:
+            return json.loads(self._path(method_name, params).read_text())
+        except FileNotFoundError:
+            return None
+
+    def put(self, method_name, params, result):
+        """
+        Stores the result if it is final, atomically so that concurrent runs can share the cache.
+        """
+        _, is_final = IMMUTABLE_METHODS[method_name]
+        if not isinstance(result, dict) or not is_final(result):
+            return
+        path = self._path(method_name, params)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+@contextmanager
+def bypass():
+    """
+    Sends the calls made within the context to the node, e.g. to check chain state such as
+    whether a class is declared, which a cached result cannot tell.
+    """
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def cache_immutable_calls(rpc_client, cache):
+    """
+    Serves the immutable JSON-RPC calls of the given starknet_py FullNodeClient from the cache,
+    without any network access on hits, and stores their final results.
+    """
+    call = rpc_client._client.call
+
+    async def cached_call(method_name, params):
+        if _bypass.get() or method_name not in IMMUTABLE_METHODS:
+            return await call(method_name, params)
+        await cache.resolve_chain_id()
+        if not cache.is_cacheable(method_name, params):
+            return await call(method_name, params)
+        result = cache.get(method_name, params)
+        if result is None:
+            result = await call(method_name, params)
+            cache.put(method_name, params, result)
+        return result
+
+    rpc_client._client.call = cached_call
+    return rpc_client
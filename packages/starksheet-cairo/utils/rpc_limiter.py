@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# The in-flight RPC requests of all the event loops are bounded by an AIMD limit, unless disabled
+RPC_ADAPTIVE_CONCURRENCY = os.getenv("RPC_ADAPTIVE_CONCURRENCY", "true").lower() in [
+    "1",
+    "true",
+]
+RPC_CONCURRENCY_INITIAL = float(os.getenv("RPC_CONCURRENCY_INITIAL", 4))
+RPC_CONCURRENCY_MIN = float(os.getenv("RPC_CONCURRENCY_MIN", 1))
+RPC_CONCURRENCY_MAX = float(
+    os.getenv("RPC_CONCURRENCY_MAX", os.getenv("HTTP_POOL_SIZE", 16))
+)
+# Factor applied to the limit on a 429, 503 or timeout
+RPC_CONCURRENCY_BACKOFF = float(os.getenv("RPC_CONCURRENCY_BACKOFF", 0.5))
+# The limit only grows while latencies stay below this factor of the lowest recent one
+RPC_CONCURRENCY_LATENCY_FACTOR = float(os.getenv("RPC_CONCURRENCY_LATENCY_FACTOR", 3))
+# Statuses telling that the provider is overloaded
+OVERLOAD_STATUSES = {429, 503}
+WINDOW = 100
+
+
+def is_overload(status=None, error=None):
+    return status in OVERLOAD_STATUSES or isinstance(error, asyncio.TimeoutError)
+
+
+class AimdLimiter:
+    """
+    Additive increase, multiplicative decrease bound on the number of requests in flight.
+
+    Each healthy response, i.e. fast enough compared with the lowest latency of the window,
+    raises the limit by 1 / limit, hence by one per round of limit requests. A rate limit or
+    timeout cuts it by RPC_CONCURRENCY_BACKOFF, at most once per round trip so that the burst
+    of errors of a single overload only counts once.
+
+    Waiters are futures of their own event loop, so that the limiter can be shared by the
+    successive loops of a script.
+    """
+
+    def __init__(
+        self,
+        initial=RPC_CONCURRENCY_INITIAL,
+        minimum=RPC_CONCURRENCY_MIN,
+        maximum=RPC_CONCURRENCY_MAX,
+        backoff=RPC_CONCURRENCY_BACKOFF,
+        latency_factor=RPC_CONCURRENCY_LATENCY_FACTOR,
+        clock=time.monotonic,
+    ):
+        self.limit = min(max(initial, minimum), maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.clock = clock
+        self.in_flight = 0
+        self.latencies = deque(maxlen=WINDOW)
+        self._waiters = deque()
+        self._last_decrease = float("-inf")
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # the slot was handed over in the meantime
+                self.release()
+            raise
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def release(self, latency=None, overloaded=False):
+        """
+        Frees a slot and adapts the limit to the outcome of the request, if any.
+        """
+        self.in_flight -= 1
+        now = self.clock()
+        if overloaded:
+            # requests sent before the last cut were sent at the previous limit
+            if now - self._last_decrease > (latency or 0):
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = now
+                logger.info(f"ℹ️  RPC concurrency limit cut to {int(self.limit)}")
+        elif latency is not None:
+            self.latencies.append(latency)
+            if latency <= self.latency_factor * min(self.latencies):
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._wake()
+
+
+class LimitedRequest:
+    """
+    Wraps an aiohttp request context manager to hold a slot of the limiter until its response
+    is handled.
+    """
+
+    def __init__(self, request, limiter):
+        self.request = request
+        self.limiter = limiter
+        self.response = None
+
+    def _release(self, status=None, error=None):
+        latency = time.perf_counter() - self.start
+        overloaded = is_overload(status, error)
+        # only successful responses tell how fast the provider is
+        healthy = error is None and status is not None and status < 500
+        self.limiter.release(
+            latency if overloaded or healthy else None, overloaded=overloaded
+        )
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        self.start = time.perf_counter()
+        try:
+            self.response = await self.request.__aenter__()
+        except BaseException as err:
+            self._release(error=err)
+            raise
+        return self.response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self.request.__aexit__(exc_type, exc, tb)
+        finally:
+            self._release(self.response.status, exc)
+
+
+limiter = AimdLimiter()
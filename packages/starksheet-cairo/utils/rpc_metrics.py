@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Opt-in: path the metrics are dumped to at exit, as Prometheus text if it ends with .prom
+# and as json otherwise
+RPC_METRICS = os.getenv("RPC_METRICS")
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_histograms = {}
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.errors = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "buckets": {
+                str(bound): count
+                for bound, count in zip([*BUCKETS, "+Inf"], self.buckets)
+            },
+            "errors": dict(self.errors),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+def enabled():
+    return RPC_METRICS is not None
+
+
+def method_name(url, payload=None):
+    """
+    Returns the JSON-RPC method of the payload, or the last segment of the url path for the
+    gateway and other plain HTTP endpoints. Batches are named after their first request.
+    """
+    if isinstance(payload, dict) and "method" in payload:
+        return payload["method"]
+    if isinstance(payload, list) and payload and "method" in payload[0]:
+        return f"batch:{payload[0]['method']}"
+    return urlparse(str(url)).path.rstrip("/").rsplit("/", 1)[-1] or "/"
+
+
+def payload_size(kwargs):
+    if kwargs.get("json") is not None:
+        return len(json.dumps(kwargs["json"]))
+    data = kwargs.get("data")
+    return len(data) if isinstance(data, (bytes, str)) else 0
+
+
+def response_error(status, body):
+    """
+    Returns the error class of an HTTP response, None when successful.
+    """
+    if status >= 400:
+        return f"HTTP{status}"
+    # single JSON-RPC requests only: batches hold an error per request, e.g. unknown receipts
+    if not body or body.lstrip()[:1] != b"{" or b'"error"' not in body:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    # "error" may as well be a key of the result, e.g. of a trace
+    return "JsonRpcError" if "error" in payload else None
+
+
+def record(method, seconds, bytes_sent=0, bytes_received=0, error=None):
+    with _lock:
+        histogram = _histograms.setdefault(method, _Histogram())
+        histogram.count += 1
+        histogram.seconds += seconds
+        histogram.buckets[bisect_left(BUCKETS, seconds)] += 1
+        histogram.bytes_sent += bytes_sent
+        histogram.bytes_received += bytes_received
+        if error is not None:
+            histogram.errors[error] += 1
+
+
+def snapshot():
+    with _lock:
+        return {method: h.to_dict() for method, h in sorted(_histograms.items())}
+
+
+def to_prometheus():
+    """
+    Returns the metrics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# TYPE starksheet_rpc_request_duration_seconds histogram",
+    ]
+    metrics = snapshot()
+    for method, histogram in metrics.items():
+        cumulative = 0
+        for bound, count in histogram["buckets"].items():
+            cumulative += count
+            lines.append(
+                f'starksheet_rpc_request_duration_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'starksheet_rpc_request_duration_seconds_sum{{method="{method}"}} {histogram["seconds"]}'
+        )
+        lines.append(
+            f'starksheet_rpc_request_duration_seconds_count{{method="{method}"}} {histogram["count"]}'
+        )
+    lines.append("# TYPE starksheet_rpc_request_errors_total counter")
+    for method, histogram in metrics.items():
+        for error, count in histogram["errors"].items():
+            lines.append(
+                f'starksheet_rpc_request_errors_total{{method="{method}",error="{error}"}} {count}'
+            )
+    lines.append("# TYPE starksheet_rpc_request_bytes_total counter")
+    for method, histogram in metrics.items():
+        for direction in ["sent", "received"]:
+            lines.append(
+                f'starksheet_rpc_request_bytes_total{{method="{method}",direction="{direction}"}} {histogram[f"bytes_{direction}"]}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    path = Path(path)
+    if path.suffix == ".prom":
+        path.write_text(to_prometheus())
+    else:
+        path.write_text(json.dumps(snapshot(), indent=2))
+    logger.info(f"ℹ️  RPC metrics written to {path}")
+
+
+class InstrumentedRequest:
+    """
+    Wraps an aiohttp request context manager to record its method, latency, sizes and error
+    once the response has been handled.
+    """
+
+    def __init__(self, request, method, bytes_sent):
+        self.request = request
+        self.method = method
+        self.bytes_sent = bytes_sent
+        self.response = None
+
+    async def __aenter__(self):
+        self.start = time.perf_counter()
+        try:
+            self.response = await self.request.__aenter__()
+        except Exception as err:
+            record(
+                self.method,
+                time.perf_counter() - self.start,
+                self.bytes_sent,
+                error=type(err).__name__,
+            )
+            raise
+        return self.response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            return await self.request.__aexit__(exc_type, exc, tb)
+        finally:
+            # aiohttp keeps the body once read by the caller
+            body = getattr(self.response, "_body", None)
+            record(
+                self.method,
+                time.perf_counter() - self.start,
+                self.bytes_sent,
+                len(body or b""),
+                exc_type.__name__
+                if exc_type is not None
+                else response_error(self.response.status, body),
+            )
+
+
+if enabled():
+    atexit.register(lambda: dump(RPC_METRICS))
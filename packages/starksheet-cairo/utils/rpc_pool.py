@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from utils.sessions import LoopSession
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Floor of the delay before a read is duplicated to the next endpoint, in seconds
+RPC_HEDGE_MIN_DELAY = float(os.getenv("RPC_HEDGE_MIN_DELAY", 0.05))
+# Delay used while an endpoint has too few latency samples for a p95
+RPC_HEDGE_DEFAULT_DELAY = float(os.getenv("RPC_HEDGE_DEFAULT_DELAY", 1))
+# An endpoint is dropped from rotation for RPC_UNHEALTHY_COOLDOWN seconds after
+# RPC_UNHEALTHY_FAILURES consecutive failures or when its p95 latency exceeds
+# RPC_UNHEALTHY_LATENCY_FACTOR times the one of the fastest endpoint
+RPC_UNHEALTHY_FAILURES = int(os.getenv("RPC_UNHEALTHY_FAILURES", 3))
+RPC_UNHEALTHY_LATENCY_FACTOR = float(os.getenv("RPC_UNHEALTHY_LATENCY_FACTOR", 4))
+RPC_UNHEALTHY_COOLDOWN = float(os.getenv("RPC_UNHEALTHY_COOLDOWN", 30))
+# Latency samples kept per endpoint, and needed before its p95 is trusted
+WINDOW = 100
+MIN_SAMPLES = 20
+# Statuses worth retrying on another endpoint
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_idempotent(payload):
+    """
+    Returns whether the JSON-RPC payload, single or batch, can safely be sent more than once,
+    i.e. does not submit any transaction.
+    """
+    payloads = payload if isinstance(payload, list) else [payload]
+    return all(
+        isinstance(item, dict)
+        and not str(item.get("method", "")).startswith("starknet_add")
+        for item in payloads
+    )
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url
+        self.latencies = deque(maxlen=WINDOW)
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    def quantile(self, q):
+        """
+        Returns the q quantile of the latest latencies, None with too few samples.
+        """
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def p95(self):
+        return self.quantile(0.95)
+
+
+class EndpointPool:
+    """
+    Stands for a LoopSession in the RPC client of a network with several endpoints: requests to
+    the url of the first endpoint are served by the healthy endpoints of the pool, fastest first.
+
+    Idempotent JSON-RPC requests are hedged: when the first endpoint has not answered after its
+    p95 latency, the same request is sent to the next endpoint and the first answer wins. They
+    also fail over to the next endpoint on connection errors, 429 and 5xx responses.
+    Transactions are only ever sent to the first endpoint.
+
+    Endpoints failing repeatedly, or much slower than the fastest one, are dropped from rotation
+    for a while, the last healthy endpoint never being dropped.
+    """
+
+    def __init__(self, urls, session=None, clock=time.monotonic):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one url")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.session = LoopSession() if session is None else session
+        self.clock = clock
+
+    @property
+    def url(self):
+        return self.endpoints[0].url
+
+    def rotation(self):
+        """
+        Returns the healthy endpoints by median latency, then the ones without enough samples,
+        e.g. back from a cooldown, in configuration order: these get their samples as the
+        target of hedges rather than as the first endpoint.
+        """
+        now = self.clock()
+        healthy = [e for e in self.endpoints if e.unhealthy_until <= now]
+
+        def key(endpoint):
+            median = endpoint.quantile(0.5)
+            return (median is None, median or 0)
+
+        return sorted(healthy or self.endpoints, key=key)
+
+    def hedge_delay(self, endpoint):
+        p95 = endpoint.p95()
+        return max(RPC_HEDGE_MIN_DELAY, RPC_HEDGE_DEFAULT_DELAY if p95 is None else p95)
+
+    def _drop(self, endpoint, reason):
+        now = self.clock()
+        if not [
+            e for e in self.endpoints if e is not endpoint and e.unhealthy_until <= now
+        ]:
+            return
+        logger.warning(
+            f"⚠️  Dropping RPC endpoint {self.endpoints.index(endpoint)} from rotation "
+            f"for {RPC_UNHEALTHY_COOLDOWN}s: {reason}"
+        )
+        endpoint.unhealthy_until = now + RPC_UNHEALTHY_COOLDOWN
+        endpoint.latencies.clear()
+        endpoint.failures = 0
+
+    def record(self, endpoint, seconds, ok):
+        if not ok:
+            endpoint.failures += 1
+            if endpoint.failures >= RPC_UNHEALTHY_FAILURES:
+                self._drop(endpoint, f"{endpoint.failures} consecutive failures")
+            return
+        endpoint.failures = 0
+        endpoint.latencies.append(seconds)
+        p95 = endpoint.p95()
+        fastest = min(
+            [e.p95() for e in self.rotation() if e.p95() is not None],
+            default=None,
+        )
+        if (
+            p95 is not None
+            and fastest is not None
+            and p95 > RPC_UNHEALTHY_LATENCY_FACTOR * fastest
+        ):
+            self._drop(endpoint, f"p95 latency {p95:.2f}s against {fastest:.2f}s")
+
+    async def _send(self, endpoint, method, kwargs):
+        start = self.clock()
+        try:
+            async with self.session.request(method, endpoint.url, **kwargs) as response:
+                # the body stays available once the connection is released
+                await response.read()
+        except asyncio.CancelledError:
+            # a hedged request losing the race took at least that long
+            endpoint.latencies.append(self.clock() - start)
+            raise
+        except Exception:
+            self.record(endpoint, self.clock() - start, ok=False)
+            raise
+        self.record(
+            endpoint,
+            self.clock() - start,
+            ok=response.status not in RETRYABLE_STATUSES,
+        )
+        return response
+
+    async def send(self, method, **kwargs):
+        """
+        Returns the response, with its body read, of the first endpoint answering.
+        """
+        endpoints = self.rotation()
+        hedged = is_idempotent(kwargs.get("json"))
+        remaining = list(reversed(endpoints if hedged else endpoints[:1]))
+        pending, error, response = set(), None, None
+
+        def launch():
+            if remaining:
+                endpoint = remaining.pop()
+                pending.add(asyncio.ensure_future(self._send(endpoint, method, kwargs)))
+
+        launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay(endpoints[0])
+                    if remaining and len(pending) == 1
+                    else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    try:
+                        response = task.result()
+                    except Exception as err:
+                        error = err
+                        continue
+                    if response.status not in RETRYABLE_STATUSES:
+                        return response
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        if response is not None:
+            return response
+        raise error
+
+    def request(self, method, url, **kwargs):
+        if url != self.url:
+            return self.session.request(method, url, **kwargs)
+        return _PooledRequest(self, method, kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+class _PooledRequest:
+    def __init__(self, pool, method, kwargs):
+        self.pool = pool
+        self.method = method
+        self.kwargs = kwargs
+
+    async def __aenter__(self):
+        return await self.pool.send(self.method, **self.kwargs)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
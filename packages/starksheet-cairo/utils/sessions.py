@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+from typing import TYPE_CHECKING
+
+from utils import rpc_limiter, rpc_metrics
+
+# aiohttp and requests are imported on first use, they are slow to import
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 60))
+
+_session = None
+# Pooled aiohttp sessions by event loop, with the async generator closing each of them
+_async_sessions = {}
+
+
+def get_session() -> "requests.Session":
+    """
+    Returns the process-wide requests session, keeping connections alive between requests.
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+        )
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def post(url, **kwargs) -> "requests.Response":
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_TIMEOUT))
+    if not rpc_metrics.enabled():
+        return get_session().post(url, **kwargs)
+
+    method = rpc_metrics.method_name(url, kwargs.get("json"))
+    bytes_sent = rpc_metrics.payload_size(kwargs)
+    start = time.perf_counter()
+    try:
+        response = get_session().post(url, **kwargs)
+    except Exception as err:
+        rpc_metrics.record(
+            method, time.perf_counter() - start, bytes_sent, error=type(err).__name__
+        )
+        raise
+    rpc_metrics.record(
+        method,
+        time.perf_counter() - start,
+        bytes_sent,
+        len(response.content),
+        rpc_metrics.response_error(response.status_code, response.content),
+    )
+    return response
+
+
+async def _close_on_loop_shutdown(session):
+    # asyncio.run finalizes pending async generators before closing the loop
+    try:
+        yield
+    finally:
+        await session.close()
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """
+    Returns the pooled aiohttp session of the running event loop.
+
+    The session is closed when the loop shuts its async generators down, which asyncio.run does.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_sessions or _async_sessions[loop][0].closed:
+        import aiohttp
+
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(
+                total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT
+            ),
+        )
+        finalizer = _close_on_loop_shutdown(session)
+        asyncio.ensure_future(finalizer.__anext__())
+        for other in [other for other in _async_sessions if other.is_closed()]:
+            del _async_sessions[other]
+        _async_sessions[loop] = (session, finalizer)
+    return _async_sessions[loop][0]
+
+
+class LoopSession:
+    """
+    Stands for the pooled session of the running event loop wherever an aiohttp session is
+    expected, e.g. by starknet_py clients built before any loop runs.
+
+    Requests are recorded by rpc_metrics when enabled, and wait for a slot of the shared
+    rpc_limiter unless disabled.
+    """
+
+    def request(self, method, url, **kwargs):
+        request = get_async_session().request(method, url, **kwargs)
+        if rpc_metrics.enabled():
+            request = rpc_metrics.InstrumentedRequest(
+                request,
+                rpc_metrics.method_name(url, kwargs.get("json")),
+                rpc_metrics.payload_size(kwargs),
+            )
+        if rpc_limiter.RPC_ADAPTIVE_CONCURRENCY:
+            request = rpc_limiter.LimitedRequest(request, rpc_limiter.limiter)
+        return request
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -1,57 +1,68 @@
-import functools
+import asyncio
+import contextvars
+import inspect
 import json
 import logging
 import random
 import subprocess
-import time
+from contextlib import asynccontextmanager
 from copy import deepcopy
-from datetime import datetime
 from pathlib import Path
-from typing import List, Union, cast
-
-import requests
-from caseconverter import snakecase
-from marshmallow import EXCLUDE
-from starknet_py.common import create_compiled_contract
-from starknet_py.contract import Contract
-from starknet_py.hash.address import compute_address
-from starknet_py.hash.class_hash import compute_class_hash
-from starknet_py.hash.transaction import compute_declare_transaction_hash
-from starknet_py.hash.utils import message_signature
-from starknet_py.net.account.account import Account, _add_signature_to_transaction
-from starknet_py.net.client_models import (
-    Call,
-    DeclareTransactionResponse,
-    SierraContractClass,
-    TransactionStatus,
-)
-from starknet_py.net.full_node_client import _create_broadcasted_txn
-from starknet_py.net.models.transaction import Declare
-from starknet_py.net.schemas.rpc import DeclareTransactionResponseSchema
-from starknet_py.net.signer.stark_curve_signer import KeyPair
-from starkware.starknet.public.abi import get_selector_from_name
+from typing import TYPE_CHECKING, Union
+
 from utils.constants import (
+    ACCOUNTS_CACHE,
     BUILD_DIR,
     BUILD_DIR_FIXTURES,
-    CONTRACTS,
-    CONTRACTS_FIXTURES,
+    CACHE_DIR,
     DEPLOYMENTS_DIR,
     ETH_TOKEN_ADDRESS,
-    GATEWAY_CLIENT,
+    MULTICALL_MAX_CALLDATA,
+    MULTICALL_MAX_CALLS,
     NETWORK,
-    RPC_CLIENT,
     SOURCE_DIR,
+    get_chain_id_async,
+    get_network_key,
 )
+from utils.json_store import JsonStore
+from utils.read_cache import BlockReadCache
+from utils.sessions import LoopSession
+
+from utils import constants, rpc_cache
+
+# starknet_py and cairo-lang take seconds to import, hence they are only imported by the
+# functions using them
+if TYPE_CHECKING:
+    from starknet_py.contract import Contract
+    from starknet_py.net.account.account import Account
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Raw HTTP requests, e.g. devnet mints, share the pool and instrumentation of the clients
+_session = LoopSession()
+
 # Due to some fee estimation issues, we skip it in all the calls and set instead
 # this hardcoded value. This has no impact apart from enforcing the signing wallet
 # to have at least 0.1 ETH
 _max_fee = int(5e15)
 
+# View calls made within pinned_block are served at the pinned block from this cache
+_read_cache = BlockReadCache()
+_pinned_block = contextvars.ContextVar("pinned_block", default=None)
+
+
+def _make_call(to_addr, function_name, calldata):
+    from starknet_py.net.client_models import Call
+    from starkware.starknet.public.abi import get_selector_from_name
+
+    return Call(
+        to_addr=to_addr,
+        selector=get_selector_from_name(function_name),
+        calldata=list(calldata),
+    )
+
 
 def int_to_uint256(value):
     value = int(value)
@@ -60,35 +71,48 @@ def int_to_uint256(value):
     return {"low": low, "high": high}
 
 
-async def get_starknet_account(
-    address=None,
-    private_key=None,
-) -> Account:
-    address = address or NETWORK["account_address"]
-    if address is None:
-        raise ValueError(
-            "address was not given in arg nor in env variable, see README.md#Deploy"
-        )
-    address = int(address, 16)
-    private_key = private_key or NETWORK["private_key"]
-    if private_key is None:
-        raise ValueError(
-            "private_key was not given in arg nor in env variable, see README.md#Deploy"
-        )
-    key_pair = KeyPair.from_private_key(int(private_key, 16))
+# Accounts resolved during this process, by (address, private_key)
+_accounts = {}
+# Cairo versions of the accounts resolved during this process, by (network key, address)
+_cairo_versions = {}
 
-    public_key = None
+
+def _get_accounts_cache_file():
+    return CACHE_DIR / "accounts" / f"{get_network_key()}.json"
+
+
+def _load_cached_account(address):
+    if not ACCOUNTS_CACHE:
+        return None
+    try:
+        return json.loads(_get_accounts_cache_file().read_text()).get(hex(address))
+    except FileNotFoundError:
+        return None
+
+
+def _dump_cached_account(address, public_key, cairo_version):
+    if not ACCOUNTS_CACHE:
+        return
+    cache_file = _get_accounts_cache_file()
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        accounts = json.loads(cache_file.read_text())
+    except FileNotFoundError:
+        accounts = {}
+    accounts[hex(address)] = {
+        "public_key": hex(public_key) if public_key is not None else None,
+        "cairo_version": cairo_version,
+    }
+    cache_file.write_text(json.dumps(accounts, indent=2))
+
+
+async def _get_public_key(address):
     for selector in ["get_public_key", "getPublicKey", "getSigner", "get_owner"]:
         try:
-            call = Call(
-                to_addr=address,
-                selector=get_selector_from_name(selector),
-                calldata=[],
-            )
-            public_key = (
-                await RPC_CLIENT.call_contract(call=call, block_hash="latest")
+            call = _make_call(address, selector, [])
+            return (
+                await constants.RPC_CLIENT.call_contract(call=call, block_hash="latest")
             )[0]
-            break
         except Exception as err:
             if (
                 err.message == "Client failed with code 40: Contract error."
@@ -101,6 +125,48 @@ async def get_starknet_account(
             else:
                 logger.error(f"Raising for account at address {hex(address)}")
                 raise err
+    return None
+
+
+async def get_starknet_account(
+    address=None,
+    private_key=None,
+) -> "Account":
+    """
+    Returns the Account of the given address, checking that its public key matches the given
+    private key when the account exposes it.
+
+    Resolved accounts are memoized for the life of the process and, when ACCOUNTS_CACHE is set,
+    their public key and cairo version are persisted so that later runs skip the RPC probes.
+    """
+    address = address or NETWORK["account_address"]
+    if address is None:
+        raise ValueError(
+            "address was not given in arg nor in env variable, see README.md#Deploy"
+        )
+    address = int(address, 16)
+    private_key = private_key or NETWORK["private_key"]
+    if private_key is None:
+        raise ValueError(
+            "private_key was not given in arg nor in env variable, see README.md#Deploy"
+        )
+    if (address, private_key) in _accounts:
+        return _accounts[(address, private_key)]
+
+    from starknet_py.net.account.account import Account
+    from starknet_py.net.client_models import SierraContractClass
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+    key_pair = KeyPair.from_private_key(int(private_key, 16))
+
+    cached = _load_cached_account(address)
+    if cached is not None:
+        public_key = (
+            int(cached["public_key"], 16) if cached["public_key"] is not None else None
+        )
+        cairo_version = cached["cairo_version"]
+    else:
+        public_key = await _get_public_key(address)
 
     if public_key is not None:
         if key_pair.public_key != public_key:
@@ -112,31 +178,135 @@ async def get_starknet_account(
             f"⚠️  Unable to verify public key for account at address 0x{address:x}"
         )
 
-    contract_class = await RPC_CLIENT.get_class_at(address)
-    cairo_version = 1 if isinstance(contract_class, SierraContractClass) else 0
-    return Account(
+    if cached is None:
+        # classes by hash are served by the disk cache of immutable RPC results
+        contract_class = await constants.RPC_CLIENT.get_class_by_hash(
+            await constants.RPC_CLIENT.get_class_hash_at(address)
+        )
+        cairo_version = 1 if isinstance(contract_class, SierraContractClass) else 0
+        _dump_cached_account(address, public_key, cairo_version)
+
+    account = Account(
         address=address,
-        client=RPC_CLIENT,
-        chain=NETWORK["chain_id"],
+        client=constants.RPC_CLIENT,
+        chain=await get_chain_id_async(),
         key_pair=key_pair,
-        cairo_version=cairo_version,
     )
+    _cairo_versions[(get_network_key(), address)] = cairo_version
+    _accounts[(address, private_key)] = account
+    return account
 
 
-async def get_eth_contract() -> Contract:
+class NonceManager:
+    """
+    Hands out the nonces of an account locally, so that transactions can be sent back-to-back
+    without waiting for the previous ones to be accepted.
+
+    The next nonce is fetched from the node on first use and after resync, which is to be
+    called whenever a transaction is rejected since the following local nonces are then off.
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.nonce = None
+        self.lock = asyncio.Lock()
+
+    async def next(self):
+        async with self.lock:
+            if self.nonce is None:
+                self.nonce = await self.account.get_nonce()
+            nonce = self.nonce
+            self.nonce += 1
+            return nonce
+
+    def resync(self):
+        self.nonce = None
+
+
+# Nonce managers by (event loop, account address)
+_nonce_managers = {}
+
+
+def get_nonce_manager(account) -> NonceManager:
+    loop = asyncio.get_running_loop()
+    key = (loop, account.address)
+    if key not in _nonce_managers:
+        for other in [other for other in _nonce_managers if other[0].is_closed()]:
+            del _nonce_managers[other]
+        _nonce_managers[key] = NonceManager(account)
+    return _nonce_managers[key]
+
+
+async def _with_nonce(account, send):
+    """
+    Returns await send(nonce) with the next local nonce of account, resyncing the nonce
+    manager if the transaction is rejected.
+    """
+    manager = get_nonce_manager(account)
+    try:
+        return await send(await manager.next())
+    except Exception:
+        manager.resync()
+        raise
+
+
+def _execute(account, calls, nonce):
+    kwargs = {}
+    # starknet-py 0.18.1 takes the cairo version of the account at each transaction, later
+    # releases resolve it from the class of the account
+    if "cairo_version" in inspect.signature(account.execute).parameters:
+        kwargs["cairo_version"] = _cairo_versions.get(
+            (get_network_key(), account.address), 0
+        )
+    return account.execute(calls, max_fee=_max_fee, nonce=nonce, **kwargs)
+
+
+# ABIs by artifact path, along with the artifact mtime they were loaded at
+_abis = {}
+# Contracts by (artifact path, address), along with the ABI they were built with
+_contracts = {}
+
+
+def get_abi(artifact):
+    """
+    Returns the ABI of the given artifact, parsed once and reloaded when the file changes.
+    """
+    artifact = Path(artifact)
+    mtime = artifact.stat().st_mtime_ns
+    if artifact not in _abis or _abis[artifact][0] != mtime:
+        _abis[artifact] = (mtime, json.loads(artifact.read_text())["abi"])
+    return _abis[artifact][1]
+
+
+def get_contract_instance(artifact, address, account) -> "Contract":
+    """
+    Returns the memoized Contract at address with the ABI of the given artifact, built again
+    when the artifact changes or when bound to another account.
+    """
+    abi = get_abi(artifact)
+    key = (Path(artifact), address)
+    cached = _contracts.get(key)
+    if cached is None or cached[0] is not abi or cached[1].account is not account:
+        from starknet_py.contract import Contract
+
+        _contracts[key] = (abi, Contract(address, abi, account))
+    return _contracts[key][1]
+
+
+async def get_eth_contract() -> "Contract":
     # TODO: use .from_address when katana implements getClass
-    return Contract(
+    return get_contract_instance(
+        Path("scripts") / "utils" / "erc20.json",
         ETH_TOKEN_ADDRESS,
-        json.loads((Path("scripts") / "utils" / "erc20.json").read_text())["abi"],
         await get_starknet_account(),
     )
 
 
-async def get_contract(contract_name) -> Contract:
+async def get_contract(contract_name) -> "Contract":
     # TODO: use .from_address when katana implements getClass
-    return Contract(
-        get_deployments()[contract_name]["address"],
-        json.loads(get_artifact(contract_name).read_text())["abi"],
+    return get_contract_instance(
+        get_artifact(contract_name),
+        get_deployment_address(contract_name),
         await get_starknet_account(),
     )
 
@@ -148,14 +318,16 @@ async def fund_address(address: Union[int, str], amount: float):
     address = int(address, 16) if isinstance(address, str) else address
     amount = amount * 1e18
     if NETWORK["name"] == "starknet-devnet":
-        response = requests.post(
+        async with _session.post(
             "http://127.0.0.1:5050/mint",
             json={"address": hex(address), "amount": amount},
-        )
-        if response.status_code != 200:
-            logger.error(f"Cannot mint token to {address}: {response.text}")
+        ) as response:
+            if response.status != 200:
+                logger.error(f"Cannot mint token to {address}: {await response.text()}")
         logger.info(f"{amount / 1e18} ETH minted to {hex(address)}")
     else:
+        from starknet_py.net.client_models import TransactionStatus
+
         account = await get_starknet_account()
         eth_contract = await get_eth_contract()
         balance = (await eth_contract.functions["balanceOf"].call(account.address)).balance  # type: ignore
@@ -166,7 +338,9 @@ async def fund_address(address: Union[int, str], amount: float):
         prepared = eth_contract.functions["transfer"].prepare(
             address, int_to_uint256(amount)
         )
-        tx = await prepared.invoke(max_fee=_max_fee)
+        tx = await _with_nonce(
+            account, lambda nonce: prepared.invoke(max_fee=_max_fee, nonce=nonce)
+        )
 
         status = await wait_for_transaction(tx.hash)
         status = "✅" if status == TransactionStatus.ACCEPTED_ON_L2 else "❌"
@@ -177,44 +351,54 @@ async def fund_address(address: Union[int, str], amount: float):
         logger.info(f"💰 Balance of {hex(address)}: {balance / 1e18}")
 
 
-def dump_declarations(declarations):
-    json.dump(
-        {name: hex(class_hash) for name, class_hash in declarations.items()},
-        open(DEPLOYMENTS_DIR / "declarations.json", "w"),
-        indent=2,
+_declarations = JsonStore(DEPLOYMENTS_DIR / "declarations.json")
+_deployments = JsonStore(DEPLOYMENTS_DIR / "deployments.json")
+
+
+def _to_hex(value):
+    return hex(value) if isinstance(value, int) else value
+
+
+def dump_declarations(declarations, replace=False):
+    """
+    Merges the given class hashes into the declarations file, or replaces it with them.
+    """
+    _declarations.update(
+        {name: _to_hex(class_hash) for name, class_hash in declarations.items()},
+        replace=replace,
     )
 
 
 def get_declarations():
     return {
-        name: int(class_hash, 16)
-        for name, class_hash in json.load(
-            open(DEPLOYMENTS_DIR / "declarations.json")
-        ).items()
+        name: int(class_hash, 16) for name, class_hash in _declarations.get().items()
     }
 
 
-def dump_deployments(deployments):
-    json.dump(
+def dump_deployments(deployments, replace=False):
+    """
+    Merges the given deployments into the deployments file, or replaces it with them.
+    """
+    _deployments.update(
         {
             name: {
                 **deployment,
-                "address": hex(deployment["address"]),
-                "tx": hex(deployment["tx"]),
+                "address": _to_hex(deployment["address"]),
+                "tx": _to_hex(deployment["tx"]),
                 "artifact": str(deployment["artifact"]),
             }
             for name, deployment in deployments.items()
         },
-        open(DEPLOYMENTS_DIR / "deployments.json", "w"),
-        indent=2,
+        replace=replace,
     )
 
 
 def get_deployments():
-    try:
-        return json.load(open(DEPLOYMENTS_DIR / "deployments.json", "r"))
-    except FileNotFoundError:
-        return {}
+    return _deployments.copy()
+
+
+def get_deployment_address(contract_name):
+    return _deployments.get()[contract_name]["address"]
 
 
 def get_artifact(contract_name):
@@ -227,6 +411,8 @@ def get_artifact(contract_name):
 
 
 def get_alias(contract_name):
+    from caseconverter import snakecase
+
     return snakecase(contract_name)
 
 
@@ -235,19 +421,20 @@ def get_tx_url(tx_hash: int) -> str:
 
 
 def is_fixture_contract(contract_name):
-    return CONTRACTS_FIXTURES.get(contract_name) is not None
+    return constants.CONTRACTS_FIXTURES.get(contract_name) is not None
 
 
 def compile_contract(contract):
     is_fixture = is_fixture_contract(contract["contract_name"])
     contract_build_path = get_artifact(contract["contract_name"])
+    contract_build_path.parent.mkdir(exist_ok=True, parents=True)
 
     output = subprocess.run(
         [
             "starknet-compile-deprecated",
-            CONTRACTS[contract["contract_name"]]
+            constants.CONTRACTS[contract["contract_name"]]
             if not is_fixture
-            else CONTRACTS_FIXTURES[contract["contract_name"]],
+            else constants.CONTRACTS_FIXTURES[contract["contract_name"]],
             "--output",
             contract_build_path,
             "--cairo_path",
@@ -293,7 +480,12 @@ def compile_contract(contract):
 
 async def deploy_starknet_account(
     private_key=None, amount: Union[int, float] = 1, update_default=True
-) -> Account:
+) -> "Account":
+    from starknet_py.hash.address import compute_address
+    from starknet_py.net.account.account import Account
+    from starknet_py.net.client_models import TransactionStatus
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
     compile_contract(
         {"contract_name": "OpenzeppelinAccount", "is_account_contract": True}
     )
@@ -320,8 +512,8 @@ async def deploy_starknet_account(
         class_hash=class_hash,
         salt=salt,
         key_pair=key_pair,
-        client=RPC_CLIENT,
-        chain=NETWORK["chain_id"],
+        client=constants.RPC_CLIENT,
+        chain=await get_chain_id_async(),
         constructor_calldata=constructor_calldata,
         max_fee=_max_fee,
     )
@@ -336,50 +528,69 @@ async def deploy_starknet_account(
 
 
 async def declare(contract_name):
+    from marshmallow import EXCLUDE
+    from starknet_py.common import create_compiled_contract
+    from starknet_py.hash.class_hash import compute_class_hash
+    from starknet_py.hash.transaction import compute_declare_transaction_hash
+    from starknet_py.hash.utils import message_signature
+    from starknet_py.net.account.account import _add_signature_to_transaction
+    from starknet_py.net.client_models import (
+        DeclareTransactionResponse,
+        TransactionStatus,
+    )
+    from starknet_py.net.full_node_client import _create_broadcasted_txn
+    from starknet_py.net.models.transaction import Declare
+    from starknet_py.net.schemas.rpc import DeclareTransactionResponseSchema
+
     logger.info(f"ℹ️  Declaring {contract_name}")
     artifact = get_artifact(contract_name)
     compiled_contract = Path(artifact).read_text()
     contract_class = create_compiled_contract(compiled_contract=compiled_contract)
     class_hash = compute_class_hash(contract_class=deepcopy(contract_class))
     try:
-        await RPC_CLIENT.get_class_by_hash(class_hash)
+        # whether the class is declared is chain state, not an immutable result
+        with rpc_cache.bypass():
+            await constants.RPC_CLIENT.get_class_by_hash(class_hash)
         logger.info("✅ Class already declared, skipping")
         return class_hash
     except Exception:
         pass
     account = await get_starknet_account()
-    transaction = Declare(
-        contract_class=contract_class,
-        sender_address=account.address,
-        max_fee=_max_fee,
-        signature=[],
-        nonce=await account.get_nonce(),
-        version=1,
-    )
-    tx_hash = compute_declare_transaction_hash(
-        contract_class=deepcopy(transaction.contract_class),
-        chain_id=account.signer.chain_id.value,
-        sender_address=account.address,
-        max_fee=transaction.max_fee,
-        version=transaction.version,
-        nonce=transaction.nonce,
-    )
-    signature = message_signature(msg_hash=tx_hash, priv_key=account.signer.private_key)
-    transaction = _add_signature_to_transaction(transaction, signature)
-    if GATEWAY_CLIENT is not None:
-        resp = await GATEWAY_CLIENT.declare(transaction)
-    else:
+
+    async def send(nonce):
+        transaction = Declare(
+            contract_class=contract_class,
+            sender_address=account.address,
+            max_fee=_max_fee,
+            signature=[],
+            nonce=nonce,
+            version=1,
+        )
+        tx_hash = compute_declare_transaction_hash(
+            contract_class=deepcopy(transaction.contract_class),
+            chain_id=account.signer.chain_id.value,
+            sender_address=account.address,
+            max_fee=transaction.max_fee,
+            version=transaction.version,
+            nonce=transaction.nonce,
+        )
+        signature = message_signature(
+            msg_hash=tx_hash, priv_key=account.signer.private_key
+        )
+        transaction = _add_signature_to_transaction(transaction, signature)
+        if constants.GATEWAY_CLIENT is not None:
+            return await constants.GATEWAY_CLIENT.declare(transaction)
         params = _create_broadcasted_txn(transaction=transaction)
 
-        res = await RPC_CLIENT._client.call(
+        res = await constants.RPC_CLIENT._client.call(
             method_name="addDeclareTransaction",
             params=[params],
         )
-        resp = cast(
-            DeclareTransactionResponse,
-            DeclareTransactionResponseSchema().load(res, unknown=EXCLUDE),
-        )
+        response = DeclareTransactionResponseSchema().load(res, unknown=EXCLUDE)
+        assert isinstance(response, DeclareTransactionResponse)
+        return response
 
+    resp = await _with_nonce(account, send)
     status = await wait_for_transaction(resp.transaction_hash)
     status = "✅" if status == TransactionStatus.ACCEPTED_ON_L2 else "❌"
     logger.info(f"{status} {contract_name} class hash: {hex(resp.class_hash)}")
@@ -387,16 +598,23 @@ async def declare(contract_name):
 
 
 async def deploy(contract_name, *args):
+    from starknet_py.contract import Contract
+    from starknet_py.net.client_models import TransactionStatus
+
     logger.info(f"ℹ️  Deploying {contract_name}")
-    abi = json.loads(Path(get_artifact(contract_name)).read_text())["abi"]
+    abi = get_abi(get_artifact(contract_name))
     account = await get_starknet_account()
 
-    deploy_result = await Contract.deploy_contract(
-        account=account,
-        class_hash=get_declarations()[contract_name],
-        abi=abi,
-        constructor_args=list(args),
-        max_fee=_max_fee,
+    deploy_result = await _with_nonce(
+        account,
+        lambda nonce: Contract.deploy_contract(
+            account=account,
+            class_hash=int(_declarations.get()[contract_name], 16),
+            abi=abi,
+            constructor_args=list(args),
+            max_fee=_max_fee,
+            nonce=nonce,
+        ),
     )
     status = await wait_for_transaction(deploy_result.hash)
     status = "✅" if status == TransactionStatus.ACCEPTED_ON_L2 else "❌"
@@ -416,41 +634,51 @@ async def invoke_address(contract_address, function_name, *calldata, account=Non
         f"ℹ️  Invoking {function_name}({json.dumps(calldata) if calldata else ''}) "
         f"at address {hex(contract_address)[:10]}"
     )
-    return await account.execute(
-        Call(
-            to_addr=contract_address,
-            selector=get_selector_from_name(function_name),
-            calldata=cast(List[int], calldata),
-        ),
-        max_fee=_max_fee,
-    )
+    call = _make_call(contract_address, function_name, calldata)
+    return await _with_nonce(account, lambda nonce: _execute(account, call, nonce))
 
 
 async def invoke_contract(
     contract_name, function_name, *inputs, address=None, account=None
 ):
     account = account or (await get_starknet_account())
-    deployments = get_deployments()
-    contract = Contract(
-        deployments[contract_name]["address"] if address is None else address,
-        json.load(open(get_artifact(contract_name)))["abi"],
+    contract = get_contract_instance(
+        get_artifact(contract_name),
+        get_deployment_address(contract_name) if address is None else address,
         account,
     )
     call = contract.functions[function_name].prepare(*inputs, max_fee=_max_fee)
     logger.info(
         f"ℹ️  Invoking {contract_name}.{function_name}({json.dumps(inputs) if inputs else ''})"
     )
-    return await account.execute(call, max_fee=_max_fee)
+    return await _with_nonce(account, lambda nonce: _execute(account, call, nonce))
+
 
+async def invoke(contract, *args, wait=True, **kwargs):
+    """
+    Sends an invoke transaction with the next local nonce of the account, then waits for it.
+
+    With wait=False, the transaction hash is returned as soon as the transaction is sent, so that
+    many invokes can be sent back-to-back and awaited together with wait_for_transactions.
+    """
+    from starknet_py.net.client_models import TransactionStatus
 
-async def invoke(contract, *args, **kwargs):
     response = await (
         invoke_address(contract, *args, **kwargs)
         if isinstance(contract, int)
         else invoke_contract(contract, *args, **kwargs)
     )
+    if not wait:
+        logger.info(
+            f"ℹ️  {contract}.{args[0]} sent at tx: {get_tx_url(response.transaction_hash)}"
+        )
+        return response.transaction_hash
     logger.info(f"⏳ Waiting for tx {get_tx_url(response.transaction_hash)}")
     status = await wait_for_transaction(response.transaction_hash)
+    if status != TransactionStatus.ACCEPTED_ON_L2:
+        get_nonce_manager(
+            kwargs.get("account") or (await get_starknet_account())
+        ).resync()
     status = "✅" if status == TransactionStatus.ACCEPTED_ON_L2 else "❌"
     logger.info(
         f"{status} {contract}.{args[0]} invoked at tx: %s",
@@ -459,26 +687,177 @@ async def invoke(contract, *args, **kwargs):
     return response.transaction_hash
 
 
+async def wait_for_transactions(transaction_hashes, account=None):
+    """
+    Waits for all the given transactions at once and returns their statuses.
+
+    The nonce manager of the account is resynced if any of them is not accepted.
+    """
+    from starknet_py.net.client_models import TransactionStatus
+
+    statuses = await asyncio.gather(
+        *[wait_for_transaction(tx_hash) for tx_hash in transaction_hashes]
+    )
+    for tx_hash, status in zip(transaction_hashes, statuses):
+        emoji = "✅" if status == TransactionStatus.ACCEPTED_ON_L2 else "❌"
+        logger.info(f"{emoji} tx {hex(tx_hash)}: {status}")
+    if any(status != TransactionStatus.ACCEPTED_ON_L2 for status in statuses):
+        get_nonce_manager(account or (await get_starknet_account())).resync()
+    return statuses
+
+
+def _prepare_call(contract, function_name, inputs, account):
+    """
+    Returns the Call of function_name and the serializer of its result, with inputs serialized
+    with the ABI of the contract when given by name, or used as raw calldata without serializer
+    when the contract is given by address.
+    """
+    if isinstance(contract, int):
+        return _make_call(contract, function_name, inputs), None
+    function = get_contract_instance(
+        get_artifact(contract), get_deployment_address(contract), account
+    ).functions[function_name]
+    return function.prepare(*inputs), _get_serializer(function)
+
+
+def _get_serializer(function):
+    """
+    Returns the serializer of the inputs and outputs of the given Cairo 0 ContractFunction.
+    """
+    from starknet_py.serialization import serializer_for_function
+
+    return serializer_for_function(
+        function.contract_data.parsed_abi.functions[function.name]
+    )
+
+
+def _deserialize(serializer, result):
+    return result if serializer is None else serializer.deserialize(result)
+
+
+def _pack_calls(calls, max_calls, max_calldata):
+    """
+    Splits the (index, call) pairs into consecutive batches of at most max_calls calls and
+    max_calldata felts of execute calldata each, a single call exceeding the budget being sent
+    alone.
+    """
+    batches, batch, calldata = [], [], 0
+    for index, call in calls:
+        # to, selector, calldata length and offset in the account __execute__ calldata
+        size = len(call.calldata) + 4
+        if batch and (len(batch) == max_calls or calldata + size > max_calldata):
+            batches.append(batch)
+            batch, calldata = [], 0
+        batch.append((index, call))
+        calldata += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def invoke_many(
+    calls,
+    account=None,
+    max_calls=MULTICALL_MAX_CALLS,
+    max_calldata=MULTICALL_MAX_CALLDATA,
+):
+    """
+    Sends the given (contract, function_name, inputs) calls as multicall transactions, packing as
+    many consecutive calls per transaction as the max_calls and max_calldata budget allows.
+
+    contract is either a contract name, whose inputs are serialized with its ABI, or an address,
+    whose inputs are the raw calldata. All the transactions are sent back-to-back and awaited
+    together, and one {"contract", "function", "tx", "status", "error"} outcome is returned per
+    call, in order. A multicall being atomic, each call has the status of its transaction.
+    """
+    account = account or (await get_starknet_account())
+    prepared = [
+        (index, _prepare_call(contract, function_name, inputs, account)[0])
+        for index, (contract, function_name, inputs) in enumerate(calls)
+    ]
+
+    outcomes = [
+        {
+            "contract": contract,
+            "function": function_name,
+            "tx": None,
+            "status": None,
+            "error": None,
+        }
+        for contract, function_name, _ in calls
+    ]
+    sent = []
+    for batch in _pack_calls(prepared, max_calls, max_calldata):
+        batch_calls = [call for _, call in batch]
+        logger.info(f"ℹ️  Invoking {len(batch)} calls in a single transaction")
+        try:
+            response = await _with_nonce(
+                account,
+                lambda nonce: _execute(account, batch_calls, nonce),
+            )
+        except Exception as error:
+            logger.error(f"❌ Cannot send {len(batch)} calls: {error}")
+            for index, _ in batch:
+                outcomes[index]["error"] = str(error)
+            continue
+        for index, _ in batch:
+            outcomes[index]["tx"] = response.transaction_hash
+        sent.append((batch, response.transaction_hash))
+
+    statuses = await wait_for_transactions([tx_hash for _, tx_hash in sent], account)
+    for (batch, _), status in zip(sent, statuses):
+        for index, _ in batch:
+            outcomes[index]["status"] = status
+    return outcomes
+
+
+@asynccontextmanager
+async def pinned_block(block_number=None):
+    """
+    Pins the view calls made by call, call_address and call_many within the context, including
+    in the tasks it spawns, to block_number, the latest block by default.
+
+    The whole batch of reads sees one consistent snapshot, and repeated reads are served from
+    memory as long as no newer block is observed, e.g. by a later pinned_block or a receipt.
+    """
+    if block_number is None:
+        block_number = await constants.RPC_CLIENT.get_block_number()
+    _read_cache.observe(block_number)
+    token = _pinned_block.set(block_number)
+    try:
+        yield block_number
+    finally:
+        _pinned_block.reset(token)
+
+
+async def _call_raw(call, client):
+    block_number = _pinned_block.get()
+    if block_number is None:
+        return await client.call_contract(call)
+    result = _read_cache.get(call, block_number)
+    if result is None:
+        result = await client.call_contract(call, block_number=block_number)
+        _read_cache.put(call, block_number, result)
+    return result
+
+
 async def call_address(contract_address, function_name, *calldata):
     account = await get_starknet_account()
-    return await account.client.call_contract(
-        Call(
-            to_addr=contract_address,
-            selector=get_selector_from_name(function_name),
-            calldata=cast(List[int], calldata),
-        )
+    return await _call_raw(
+        _make_call(contract_address, function_name, calldata), account.client
     )
 
 
 async def call_contract(contract_name, function_name, *inputs, address=None):
-    deployments = get_deployments()
     account = await get_starknet_account()
-    contract = Contract(
-        deployments[contract_name]["address"] if address is None else address,
-        json.load(open(get_artifact(contract_name)))["abi"],
+    function = get_contract_instance(
+        get_artifact(contract_name),
+        get_deployment_address(contract_name) if address is None else address,
         account,
+    ).functions[function_name]
+    return _get_serializer(function).deserialize(
+        await _call_raw(function.prepare(*inputs), account.client)
     )
-    return await contract.functions[function_name].call(*inputs)
 
 
 async def call(contract, *args, **kwargs):
@@ -489,56 +868,355 @@ async def call(contract, *args, **kwargs):
     )
 
 
+async def _aggregate(multicall_address, calls, client, block_number=None):
+    """
+    Calls Multicall.aggregate with the given calls at block_number, the latest block by default,
+    and returns the raw result of each of them.
+    """
+    call_array, data = [], []
+    for call in calls:
+        call_array += [call.to_addr, call.selector, len(data), len(call.calldata)]
+        data += call.calldata
+    response = await client.call_contract(
+        _make_call(
+            multicall_address, "aggregate", [len(calls), *call_array, len(data), *data]
+        ),
+        block_number=block_number,
+    )
+    # block_number, retdata_len, then the length and data of each result
+    retdata = response[2:]
+    results, offset = [], 0
+    for _ in calls:
+        size = retdata[offset]
+        results.append(retdata[offset + 1 : offset + 1 + size])
+        offset += 1 + size
+    return results
+
+
+# Messages of the errors due to the size of an aggregate call, i.e. the node refusing too large a
+# request or response, or the call running out of steps, as opposed to one of its calls reverting
+_LIMIT_ERROR_MESSAGES = (
+    "payload too large",
+    "request entity too large",
+    "response too large",
+    "runresources has no remaining steps",
+    "too many steps",
+)
+
+
+def _is_limit_error(error):
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # starknet-py raises the HTTP status of a failed request as its code, aiohttp as its status
+    if (
+        str(getattr(error, "code", None)) == "413"
+        or getattr(error, "status", None) == 413
+    ):
+        return True
+    message = str(error).lower()
+    return any(limit_message in message for limit_message in _LIMIT_ERROR_MESSAGES)
+
+
+async def _aggregate_or_split(multicall_address, calls, client, block_number=None):
+    """
+    Returns the raw results of the calls, splitting the aggregate call in two down to single
+    calls when it hits a node limit. Any other error, e.g. a call reverting, is raised as is.
+    """
+    try:
+        return await _aggregate(multicall_address, calls, client, block_number)
+    except Exception as error:
+        if not _is_limit_error(error):
+            raise
+        if len(calls) == 1:
+            # surface the error of the call itself
+            return [await client.call_contract(calls[0], block_number=block_number)]
+        half = len(calls) // 2
+        return [
+            *(
+                await _aggregate_or_split(
+                    multicall_address, calls[:half], client, block_number
+                )
+            ),
+            *(
+                await _aggregate_or_split(
+                    multicall_address, calls[half:], client, block_number
+                )
+            ),
+        ]
+
+
+async def call_many(
+    calls, max_calls=MULTICALL_MAX_CALLS, max_calldata=MULTICALL_MAX_CALLDATA
+):
+    """
+    Calls the given (contract, function_name, inputs) view functions with as few requests as
+    possible through the deployed Multicall.aggregate, and returns their results in order.
+
+    As with call, results are decoded with the ABI of the contract when given by name and left
+    as raw felts when given by address. The calls are packed within the same budget as
+    invoke_many; an aggregate call hitting a node limit, e.g. because its response is too large,
+    is split in two down to single calls. Without a deployed Multicall, the calls are sent
+    concurrently one by one. Within pinned_block, the calls already cached are not sent again.
+    """
+    account = await get_starknet_account()
+    prepared, serializers = [], []
+    for index, (contract, function_name, inputs) in enumerate(calls):
+        call, serializer = _prepare_call(contract, function_name, inputs, account)
+        prepared.append((index, call))
+        serializers.append(serializer)
+    block_number = _pinned_block.get()
+    raw = [
+        None if block_number is None else _read_cache.get(call, block_number)
+        for _, call in prepared
+    ]
+    missing = [(index, call) for index, call in prepared if raw[index] is None]
+    multicall = _deployments.get().get("Multicall")
+    if not missing:
+        fetched = []
+    elif multicall is None:
+        fetched = await asyncio.gather(
+            *[
+                account.client.call_contract(call, block_number=block_number)
+                for _, call in missing
+            ]
+        )
+    else:
+        address = multicall["address"]
+        address = int(address, 16) if isinstance(address, str) else address
+        batches = _pack_calls(missing, max_calls, max_calldata)
+        logger.info(
+            f"ℹ️  Calling {len(missing)} views in {len(batches)} aggregate calls"
+        )
+        fetched = [
+            result
+            for results in await asyncio.gather(
+                *[
+                    _aggregate_or_split(
+                        address,
+                        [call for _, call in batch],
+                        account.client,
+                        block_number,
+                    )
+                    for batch in batches
+                ]
+            )
+            for result in results
+        ]
+    for (index, call), result in zip(missing, fetched):
+        raw[index] = result
+        if block_number is not None:
+            _read_cache.put(call, block_number, result)
+    return [
+        _deserialize(serializer, result) for serializer, result in zip(serializers, raw)
+    ]
+
+
+class _PendingReceipt:
+    def __init__(
+        self, future, check_interval, max_wait, backoff_factor, max_check_interval
+    ):
+        self.future = future
+        self.check_interval = check_interval
+        self.deadline = future.get_loop().time() + max_wait
+        self.backoff_factor = backoff_factor
+        self.max_check_interval = max_check_interval
+        self.status = None
+
+    def resolve(self, status):
+        if not self.future.done():
+            self.future.set_result(status)
+
+
+class _ReceiptPoller:
+    """
+    Polls the receipts of all the pending transactions of an event loop with a single JSON-RPC
+    batch request per tick, so that the request rate does not grow with the number of pending
+    transactions. Nodes not supporting batches are polled with a request per transaction.
+
+    Each transaction backs off on its own and the poller ticks at the smallest of their check
+    intervals, until their deadline.
+    """
+
+    # asyncio.sleep can wake up slightly before its deadline
+    _clock_tolerance = 1e-2
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = {}
+        self.task = None
+        # urls of the nodes answering batches with a single error object
+        self.unbatched = set()
+
+    def wait(self, transaction_hash, **kwargs):
+        if transaction_hash not in self.pending:
+            self.pending[transaction_hash] = _PendingReceipt(
+                self.loop.create_future(), **kwargs
+            )
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self._run())
+        return self.pending[transaction_hash].future
+
+    async def _run(self):
+        while self.pending:
+            now = self.loop.time()
+            sleep = min(
+                min(entry.check_interval, entry.deadline - now)
+                for entry in self.pending.values()
+            )
+            logger.info(f"ℹ️  Sleeping for {max(sleep, 0):.2f}s")
+            await asyncio.sleep(max(sleep, 0))
+            try:
+                await self._poll()
+            except Exception as err:
+                # a transient error, e.g. a timeout or a 429, is retried on the next tick and
+                # only fails the transactions past their deadline
+                logger.warning(f"⚠️  Cannot poll receipts, retrying: {err!r}")
+                self._back_off(err)
+
+    def _back_off(self, err):
+        now = self.loop.time()
+        for transaction_hash, entry in list(self.pending.items()):
+            if now + self._clock_tolerance >= entry.deadline:
+                if not entry.future.done():
+                    entry.future.set_exception(err)
+                del self.pending[transaction_hash]
+            else:
+                entry.check_interval = min(
+                    entry.check_interval * entry.backoff_factor,
+                    entry.max_check_interval,
+                )
+
+    @staticmethod
+    def _receipt_request(transaction_hash, i):
+        return {
+            "jsonrpc": "2.0",
+            "method": "starknet_getTransactionReceipt",
+            "params": {"transaction_hash": hex(transaction_hash)},
+            "id": i,
+        }
+
+    async def _fetch(self, payload):
+        async with constants.RPC_SESSION.post(
+            constants.RPC_CLIENT.url, json=payload
+        ) as response:
+            response.raise_for_status()
+            return json.loads(await response.text())
+
+    async def _poll(self):
+        hashes = list(self.pending)
+        url = constants.RPC_CLIENT.url
+        if url not in self.unbatched:
+            payload = await self._fetch(
+                [
+                    self._receipt_request(transaction_hash, i)
+                    for i, transaction_hash in enumerate(hashes)
+                ]
+            )
+            if not isinstance(payload, list):
+                # some nodes, e.g. starknet-devnet, answer batches with a single error object
+                logger.warning(
+                    f"⚠️  Unexpected JSON-RPC batch response, polling one by one: {payload}"
+                )
+                self.unbatched.add(url)
+        if url in self.unbatched:
+            payload = await asyncio.gather(
+                *[
+                    self._fetch(self._receipt_request(transaction_hash, i))
+                    for i, transaction_hash in enumerate(hashes)
+                ]
+            )
+        payloads = {item.get("id"): item for item in payload}
+        # the state read by pinned_block changes with the blocks including our transactions
+        blocks = [
+            item["result"]["block_number"]
+            for item in payload
+            if isinstance(item.get("result"), dict)
+            and isinstance(item["result"].get("block_number"), int)
+        ]
+        if blocks:
+            _read_cache.observe(max(blocks))
+
+        now = self.loop.time()
+        for i, transaction_hash in enumerate(hashes):
+            entry = self.pending[transaction_hash]
+            entry.status, done = _parse_receipt_status(
+                payloads.get(i, {}), entry.status
+            )
+            if done or now + self._clock_tolerance >= entry.deadline:
+                logger.info(f"ℹ️  Status of tx {hex(transaction_hash)}: {entry.status}")
+                entry.resolve(entry.status)
+                del self.pending[transaction_hash]
+            else:
+                entry.check_interval = min(
+                    entry.check_interval * entry.backoff_factor,
+                    entry.max_check_interval,
+                )
+        if self.pending:
+            logger.info(f"ℹ️  {len(self.pending)} transaction(s) still pending")
+
+
+def _parse_receipt_status(payload, status):
+    """
+    Returns the status of a starknet_getTransactionReceipt response and whether to stop waiting.
+    """
+    from starknet_py.net.client_models import TransactionStatus
+
+    if payload.get("error"):
+        if payload["error"]["message"] != "Transaction hash not found":
+            logger.warn(json.dumps(payload["error"]))
+            return status, True
+    status = payload.get("result", {}).get("status")
+    if status is not None:
+        status = TransactionStatus(status)
+    else:
+        # no status, but RPC currently doesn't return status for ACCEPTED_ON_L2 still PENDING
+        # we take actual_fee as a proxy for ACCEPTED_ON_L2
+        if payload.get("result", {}).get("actual_fee"):
+            status = TransactionStatus.ACCEPTED_ON_L2
+    return status, status in [
+        TransactionStatus.ACCEPTED_ON_L2,
+        TransactionStatus.REJECTED,
+    ]
+
+
+_receipt_poller = None
+
+
+def _get_receipt_poller():
+    global _receipt_poller
+    loop = asyncio.get_running_loop()
+    if _receipt_poller is None or _receipt_poller.loop is not loop:
+        _receipt_poller = _ReceiptPoller(loop)
+    return _receipt_poller
+
+
 # TODO: use RPC_CLIENT when RPC wait_for_tx is fixed, see https://github.com/kkrt-labs/kakarot/issues/586
 # TODO: Currently, the first ping often throws "transaction not found"
-@functools.wraps(RPC_CLIENT.wait_for_tx)
 async def wait_for_transaction(*args, **kwargs):
     """
     We need to write this custom hacky wait_for_transaction instead of using the one from starknet-py
     because the RPCs don't know RECEIVED, PENDING and REJECTED states currently.
+
+    The receipt is polled by the process-wide receipt poller, starting every check_interval seconds
+    and backing off by backoff_factor up to max_check_interval, so that many transactions can be
+    awaited concurrently with a single request per tick.
     """
-    if GATEWAY_CLIENT is not None:
+    if constants.GATEWAY_CLIENT is not None:
         # Gateway case, just use it
-        receipt = await GATEWAY_CLIENT.wait_for_tx(*args, **kwargs)
+        receipt = await constants.GATEWAY_CLIENT.wait_for_tx(*args, **kwargs)
         return receipt.status
 
-    start = datetime.now()
-    elapsed = 0
-    check_interval = kwargs.get("check_interval", NETWORK.get("check_interval", 15))
     max_wait = kwargs.get("max_wait", NETWORK.get("max_wait", 30))
     transaction_hash = args[0] if args else kwargs["tx_hash"]
-    status = None
     logger.info(f"⏳ Waiting for tx {get_tx_url(transaction_hash)}")
-    while (
-        status not in [TransactionStatus.ACCEPTED_ON_L2, TransactionStatus.REJECTED]
-        and elapsed < max_wait
-    ):
-        if elapsed > 0:
-            # don't log at the first iteration
-            logger.info(f"ℹ️  Current status: {status}")
-        logger.info(f"ℹ️  Sleeping for {check_interval}s")
-        time.sleep(check_interval)
-        response = requests.post(
-            RPC_CLIENT.url,
-            json={
-                "jsonrpc": "2.0",
-                "method": "starknet_getTransactionReceipt",
-                "params": {"transaction_hash": hex(transaction_hash)},
-                "id": 0,
-            },
-        )
-        payload = json.loads(response.text)
-        if payload.get("error"):
-            if payload["error"]["message"] != "Transaction hash not found":
-                logger.warn(json.dumps(payload["error"]))
-                break
-        status = payload.get("result", {}).get("status")
-        if status is not None:
-            status = TransactionStatus(status)
-        else:
-            # no status, but RPC currently doesn't return status for ACCEPTED_ON_L2 still PENDING
-            # we take actual_fee as a proxy for ACCEPTED_ON_L2
-            if payload.get("result", {}).get("actual_fee"):
-                status = TransactionStatus.ACCEPTED_ON_L2
-        elapsed = (datetime.now() - start).total_seconds()
-    return status
+    future = _get_receipt_poller().wait(
+        transaction_hash,
+        check_interval=kwargs.get("check_interval", NETWORK.get("check_interval", 15)),
+        max_wait=max_wait,
+        backoff_factor=kwargs.get("backoff_factor", NETWORK.get("backoff_factor", 1.5)),
+        max_check_interval=kwargs.get(
+            "max_check_interval", NETWORK.get("max_check_interval", max_wait)
+        ),
+    )
+    # the future may be shared by several waiters, don't cancel it with this one
+    return await asyncio.shield(future)
@@ -1,19 +1,12 @@
 import logging
 import random
+from typing import TYPE_CHECKING
 
 from dotenv import load_dotenv
-from starknet_py.hash.address import compute_address
-from starknet_py.net.account.account import Account
-from starknet_py.net.client_models import TransactionStatus
-from starknet_py.net.signer.stark_curve_signer import KeyPair
-from starkware.starknet.core.os.contract_address.contract_address import (
-    calculate_contract_address_from_hash,
-)
-from starkware.starknet.public.abi import get_selector_from_name
 
 load_dotenv()
 
-from utils.constants import NETWORK, RPC_CLIENT
+from utils.constants import NETWORK, get_chain_id_async
 from utils.starknet import (
     call,
     compile_contract,
@@ -24,12 +17,22 @@ from utils.starknet import (
     wait_for_transaction,
 )
 
+from utils import constants
+
+if TYPE_CHECKING:
+    from starknet_py.net.account.account import Account
+
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
 async def compute_sheet_address(name, symbol):
+    from starkware.starknet.core.os.contract_address.contract_address import (
+        calculate_contract_address_from_hash,
+    )
+    from starkware.starknet.public.abi import get_selector_from_name
+
     renderer_address = (
         await call("Starksheet", "getSheetDefaultRendererAddress")
     ).address
@@ -57,7 +60,12 @@ async def compute_sheet_address(name, symbol):
     )
 
 
-async def deploy_starknet_account(private_key=None, amount=1) -> Account:
+async def deploy_starknet_account(private_key=None, amount=1) -> "Account":
+    from starknet_py.hash.address import compute_address
+    from starknet_py.net.account.account import Account
+    from starknet_py.net.client_models import TransactionStatus
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
     compile_contract(
         {"contract_name": "OpenzeppelinAccount", "is_account_contract": True}
     )
@@ -78,14 +86,14 @@ async def deploy_starknet_account(private_key=None, amount=1) -> Account:
     )
     logger.info(f"ℹ️  Funding account {hex(address)} with {amount} ETH")
     await fund_address(address, amount=amount)
-    logger.info("ℹ️  Deploying account"unt")
+    logger.info("ℹ️  Deploying account")
     res = await Account.deploy_account(
         address=address,
         class_hash=class_hash,
         salt=salt,
         key_pair=key_pair,
-        client=RPC_CLIENT,
-        chain=NETWORK["chain_id"],
+        client=constants.RPC_CLIENT,
+        chain=await get_chain_id_async(),
         constructor_calldata=constructor_calldata,
         max_fee=int(1e17),
     )